@@ -6,20 +6,87 @@ except ImportError:
     print("Warning: requests module not available. Install with: pip install requests")
     requests = None
 
-import os, re, json, csv, logging, math, time, subprocess, perplexity, ollama
+import os, re, ast, json, csv, fcntl, logging, math, time, shutil, hashlib, threading, subprocess, perplexity, ollama
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
+from types import SimpleNamespace
 from perplexity import Perplexity
 from dotenv import load_dotenv
 from openai import OpenAI
 from pathlib import Path
 import pandas as pd
+import numpy as np
 
 from knowledge import *
+from scheduler import ResearchBudget, BudgetExhausted, HedgePolicy
+from scoring import ScoringService
+from fetcher import DocumentFetcher
+from linkcheck import LinkChecker
+from semantic import SemanticCache
 
 base_path = os.path.dirname(os.path.abspath(__file__))
+dimension_fields = ['length_cm', 'height_cm', 'width_cm', 'weight_kg']
+research_fields = ['description', 'price', *dimension_fields, 'technical_specs', 'technical_doc']
+text_fields = ['description', 'technical_specs', 'technical_doc']
+missing_values = ('nan', '0', '[]', '{}', '')
+# Completion settings of a field query, overridden per field in query-profiles.json
+default_profile = {
+    'model': 'sonar-pro',
+    'max_tokens': 300,
+    'temperature': None,
+    'stop': None,
+    'tools': True,
+    # number, json and url answers are streamed and cut once complete, text is read whole
+    'format': 'text',
+    # Unparseable web answers are first handed to the local model before a new web search
+    'local': True,
+    'local_model': 'phi',
+    # Minimum name similarity to reuse the field of a near-duplicate listing, None never reuses it
+    'semantic': 0.92,
+}
+# Unit factors to centimetres and kilograms, for dimensions found in technical specs
+length_units = {'mm': 0.1, 'cm': 1.0, 'm': 100.0, 'in': 2.54, 'inch': 2.54, 'inches': 2.54, 'pouces': 2.54, '"': 2.54, "''": 2.54}
+weight_units = {'g': 0.001, 'kg': 1.0, 'lb': 0.45359237, 'lbs': 0.45359237, 'livres': 0.45359237, 'oz': 0.028349523}
+# A number, French thousands spaces included ('1 200 g')
+number_pattern = r'(?:\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d+)(?:[.,]\d+)?'
+spec_keys = {
+    'weight_kg': r'\b(?:poids|weight|masse)\b',
+    'length_cm': r'\b(?:longueur|length|profondeur|depth)\b',
+    'width_cm': r'\b(?:largeur|width)\b',
+    'height_cm': r'\b(?:hauteur|height)\b',
+}
+# Keys about a part, an accessory or a limit rather than the body ('Cable length', 'Max load weight', 'Bit depth')
+spec_excluded = r'c[aâ]ble|cordon|\bcord\b|load|charge|capacit|\bmax|\bmin|\bbit|range|plage|stand|pied|r[ée]glable|adjustable|scale|diapason|neck|manche|\bkeys?\b|touches?\b|screen|[ée]cran|display|speaker|haut-parleur|driver|strings?\b|cordes?\b'
+# Local model tasks: extract or rewrite an answer the web model already gave
+local_prompts = {
+    'json': "Convertis ces caractéristiques techniques en un unique objet JSON valide (clés → valeurs), sans autre texte.\n\n{text}",
+    'url': "Extrais de ce texte le lien vers le manuel ou la documentation technique. Réponds uniquement par l'URL.\n\n{text}",
+    'text': "Réécris ce texte en un unique paragraphe de description de produit en français, sans titre, sans markdown ni références.\n\n{text}",
+}
+field_prompts = {
+    'description': 'prompt-description.md',
+    'price': 'prompt-price.md',
+    'length_cm': 'prompt-longueur.md',
+    'height_cm': 'prompt-hauteur.md',
+    'width_cm': 'prompt-largeur.md',
+    'weight_kg': 'prompt-poids.md',
+    'technical_specs': 'prompt-technical.md',
+    'technical_doc': 'prompt-documentation.md',
+}
+
+def load_query_profiles(profiles_file: str) -> Dict[str, dict]:
+    try:
+        with open(profiles_file, "r", encoding="utf-8") as f:
+            profiles = json.load(f)
+    except Exception as e:
+        logging.error(f"Failed to read query profiles: {e}")
+        profiles = {}
+    default = {**default_profile, **profiles.get("default", {})}
+    return {field_name: {**default, **profiles.get(field_name, {})} for field_name in [*research_fields, "default"]}
 
 @dataclass
 class InstrumentData:
@@ -37,6 +104,15 @@ class InstrumentData:
     confidence_score: float
     llm2llm_score: float
     retries_number: int
+    is_published: bool = False
+    push_forward: bool = False
+    base_price_per_day: float = 0.0
+    # Fields filled from the knowledge graph, with the value read there
+    known_fields: Dict[str, str] = field(default_factory=dict)
+    # Fields already parsed from their answer, left as they are by later validation rounds
+    extracted_fields: set = field(default_factory=set)
+    # Fields copied from a near-duplicate listing, never indexed again under this name
+    reused_fields: set = field(default_factory=set)
     
     def to_csv_dict(self) -> Dict:
         return {
@@ -57,8 +133,38 @@ class InstrumentData:
             'retries_number': self.retries_number or '0'
         }
 
+class SingleFlight():
+
+    # Concurrent calls sharing a key wait on the leader's in-flight call
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.calls[key] = future
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+
 class Expert():
 
+    # Shared by every expert so parallel experts coalesce identical queries
+    inflight = SingleFlight()
+
     def __init__(self):
         load_dotenv()
         self.tools = tools
@@ -74,7 +180,7 @@ class Expert():
         except Exception as e:
             logging.error("❌ Ollama Client Error: {e} \n")
         try:
-            self.M_client = MCPClient('https://fattily-synetic-arnold.ngrok-free.dev')
+            self.M_client = connect_bridge()
             self.M_client.session.headers.update({
                 "ngrok-skip-browser-warning": "true",
                 "User-Agent": "MCP-Client/1.0"
@@ -82,8 +188,44 @@ class Expert():
             logging.info("✅ MCP Client Enbled \n")
         except Exception as e:
             logging.error("❌ MCP Client Error: {e} \n")
-        self.errors_file = os.path.join(self.output_path, "../errors.csv")
-        self.context = self._load_context(os.path.join(self.source_path, "context.json"))
+        self.public_bridge_url = os.getenv("MCP_PUBLIC_URL")
+        self.max_tool_rounds = int(os.getenv("AUTOLOGUE_TOOL_ROUNDS", "3"))
+        self.streaming = os.getenv("AUTOLOGUE_STREAM", "1") != "0"
+        self.knowledge_enabled = os.getenv("AUTOLOGUE_KNOWLEDGE", "1") != "0"
+        # Numbers are recalled on the confidence score (100 = no deviation from the category), texts on the llm2llm score
+        self.knowledge_confidence = float(os.getenv("AUTOLOGUE_KNOWLEDGE_CONFIDENCE", "100"))
+        self.knowledge_llm2llm = float(os.getenv("AUTOLOGUE_KNOWLEDGE_LLM2LLM", "66"))
+        # Prices go stale, a recalled one must be younger than this
+        self.knowledge_max_age = {'price': timedelta(days=float(os.getenv("AUTOLOGUE_KNOWLEDGE_PRICE_DAYS", "60")))}
+        self.concurrency = int(os.getenv("AUTOLOGUE_CONCURRENCY", "1"))
+        # Fields a session researches again, the others are taken from the catalogue (empty = every missing field)
+        self.refresh_fields = [field_name for field_name in os.getenv("AUTOLOGUE_REFRESH_FIELDS", "").replace(" ", "").split(",") if field_name in research_fields]
+        self.budget = ResearchBudget()
+        # Shared by the scheduler when hedging is enabled for the run
+        self.hedging: Optional[HedgePolicy] = None
+        self._init_session()
+        self.price_bands = self._load_price_bands(os.path.join(base_path, "price-bands.json"))
+        self.query_profiles = load_query_profiles(os.path.join(base_path, "query-profiles.json"))
+        self.llm2llm_enabled = os.getenv("AUTOLOGUE_LLM2LLM", "1") == "1"
+        # Cleared once the local model cannot be reached, unreadable answers then go straight back to the web
+        self.local_available = getattr(self, "O_client", None) is not None
+        self.scorer = ScoringService(
+            getattr(self, "O_client", None),
+            os.path.join(self.cache_path, "llm2llm-scores.json"),
+            workers=int(os.getenv("LLM2LLM_WORKERS", "4")),
+            seed_file=os.path.join(self.default_paths["cache"], "llm2llm-scores.json")
+        )
+        self.check_links = os.getenv("AUTOLOGUE_CHECK_LINKS", "1") == "1"
+        self.link_checker = LinkChecker(os.path.join(self.cache_path, "links.json"), seed_file=os.path.join(self.default_paths["cache"], "links.json"))
+        self.fetcher = DocumentFetcher(os.path.join(self.cache_path, "docs"), pool_size=int(os.getenv("LLM2LLM_WORKERS", "4")))
+        self.semantic_enabled = os.getenv("AUTOLOGUE_SEMANTIC", "1") != "0"
+        self.semantic = SemanticCache(
+            getattr(self, "O_client", None),
+            os.path.join(self.cache_path, "semantic-index.npz"),
+            seed_file=os.path.join(self.default_paths["cache"], "semantic-index.npz"),
+            model=os.getenv("AUTOLOGUE_EMBED_MODEL", "nomic-embed-text")
+        )
+        self.context = self._load_context(self.context_file)
         self.price_prompt = self._fetch_prompt(os.path.join(base_path,"prompt-price.md"))
         self.agent_prompt = self._fetch_prompt(os.path.join(self.source_path,"prompt-agent.md"))
         self.technical_prompt = self._fetch_prompt(os.path.join(base_path,"prompt-technical.md"))
@@ -95,113 +237,604 @@ class Expert():
         self.documentation_prompt = self._fetch_prompt(os.path.join(base_path,"prompt-documentation.md"))
         self.fieldnames = ['id', 'name', 'type', 'model', 'description', 'price', 'length_cm', 'height_cm', 'width_cm', 'weight_kg', 'technical_specs', 'technical_doc', 'confidence_score', 'llm2llm_score', 'retries_number']
 
+    def _init_session(self):
+        # The default session writes in place, any other one in <expert>/sessions/<session_id>/
+        self.session_id = getattr(self, "session_id", "default")
+        self.expert_path = os.path.normpath(os.path.join(self.source_path, ".."))
+        self.default_paths = {
+            "context": os.path.join(self.source_path, "context.json"),
+            "errors": os.path.join(self.expert_path, "errors.csv"),
+            "outputs": self.output_path,
+            "answers": self.answer_path,
+            "cache": os.path.join(self.expert_path, "cache/"),
+        }
+        if self.session_id == "default":
+            self.session_path = self.expert_path
+            paths = self.default_paths
+        else:
+            self.session_path = os.path.join(self.expert_path, "sessions", self.session_id)
+            paths = {
+                "context": os.path.join(self.session_path, "context.json"),
+                "errors": os.path.join(self.session_path, "errors.csv"),
+                "outputs": os.path.join(self.session_path, "outputs/"),
+                "answers": os.path.join(self.session_path, "answers/"),
+                "cache": os.path.join(self.session_path, "cache/"),
+            }
+            os.makedirs(paths["outputs"], exist_ok=True)
+            # A new session keeps the reference caches of the default session but researches every instrument again
+            if not os.path.isfile(paths["context"]) and os.path.isfile(self.default_paths["context"]):
+                with open(self.default_paths["context"], "r", encoding="utf-8") as f:
+                    default_context = json.load(f)
+                self._replace_json(paths["context"], {**default_context, "instruments_processed": [], "failed_searches": []})
+        self.context_file = paths["context"]
+        self.errors_file = paths["errors"]
+        self.output_path = paths["outputs"]
+        self.answer_path = paths["answers"]
+        self.cache_path = paths["cache"]
+        if getattr(self, "output_file", None):
+            self.output_file = os.path.join(self.output_path, os.path.basename(self.output_file))
+
+    def promote_session(self):
+        if self.session_id == "default":
+            return
+        logging.info(f"📤 Promoting session '{self.session_id}' into {self.expert_path} \n")
+        # A default run may be writing the same files: hold the expert lock and replace files whole
+        with self._locked():
+            # Outputs: session rows replace default rows with the same id
+            os.makedirs(self.default_paths["outputs"], exist_ok=True)
+            for file in os.listdir(self.output_path):
+                session_df = pd.read_csv(os.path.join(self.output_path, file), dtype=str)
+                default_file = os.path.join(self.default_paths["outputs"], file)
+                if os.path.isfile(default_file):
+                    default_df = pd.read_csv(default_file, dtype=str)
+                    default_df = default_df[~default_df["id"].isin(session_df["id"])]
+                    session_df = pd.concat([default_df, session_df], ignore_index=True)
+                self._replace_csv(default_file, session_df)
+            # Errors are appended, answers and fetched documents copied
+            if os.path.isfile(self.errors_file):
+                errors_df = pd.read_csv(self.errors_file, dtype=str)
+                if os.path.isfile(self.default_paths["errors"]):
+                    errors_df = pd.concat([pd.read_csv(self.default_paths["errors"], dtype=str), errors_df], ignore_index=True)
+                self._replace_csv(self.default_paths["errors"], errors_df)
+            for session_dir, default_dir in ((self.answer_path, self.default_paths["answers"]), (os.path.join(self.cache_path, "docs"), os.path.join(self.default_paths["cache"], "docs"))):
+                if os.path.isdir(session_dir):
+                    shutil.copytree(session_dir, default_dir, dirs_exist_ok=True)
+            self._merge_caches()
+            # Context: session knowledge wins for the instruments it researched
+            default_context = {}
+            if os.path.isfile(self.default_paths["context"]):
+                with open(self.default_paths["context"], "r", encoding="utf-8") as f:
+                    default_context = json.load(f)
+            researched = set(self.context["instruments_processed"]) | set(self.context["failed_searches"])
+            self._replace_json(self.default_paths["context"], self._merge_context(default_context, self.context, researched))
+        shutil.rmtree(self.session_path, ignore_errors=True)
+        logging.info(f"✅ Session '{self.session_id}' promoted. \n")
+
+    def _merge_caches(self):
+        """Union of the session caches with the default ones, a default run may have added entries meanwhile"""
+        # Both caches are saved after each batch, the semantic index only when it changed
+        for file in ("llm2llm-scores.json", "links.json"):
+            session_file = os.path.join(self.cache_path, file)
+            if not os.path.isfile(session_file):
+                continue
+            default_file = os.path.join(self.default_paths["cache"], file)
+            merged = {}
+            for cache_file in (default_file, session_file):
+                if os.path.isfile(cache_file):
+                    with open(cache_file, "r", encoding="utf-8") as f:
+                        merged.update(json.load(f))
+            self._replace_json(default_file, merged)
+        self.semantic.save()
+        if os.path.isfile(self.semantic.index_file):
+            default_index = SemanticCache(None, os.path.join(self.default_paths["cache"], "semantic-index.npz"), model=self.semantic.model)
+            default_index.merge(self.semantic)
+            default_index.save()
+
+    def _merge_context(self, base: dict, update: dict, names: set) -> dict:
+        """base context where update's entries win for the given instrument names"""
+        processed = list(dict.fromkeys(base.get("instruments_processed", []) + [name for name in update.get("instruments_processed", []) if name in names]))
+        merged = {"instruments_processed": processed}
+        for key in ("price_cache", "dimensions_cache"):
+            updated = [entry for entry in update.get(key, []) if entry.split(" : ")[0] in names]
+            owners = {entry.split(" : ")[0] for entry in updated}
+            merged[key] = [entry for entry in base.get(key, []) if entry.split(" : ")[0] not in owners] + updated
+        failed = [name for name in base.get("failed_searches", []) if name not in names] + [name for name in update.get("failed_searches", []) if name in names]
+        merged["failed_searches"] = [name for name in dict.fromkeys(failed) if name not in set(processed)]
+        merged["last_updated"] = datetime.now().strftime("%d-%m-%y-%Hh%M:%S")
+        return merged
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock on the expert's files, shared by every process and session"""
+        os.makedirs(self.expert_path, exist_ok=True)
+        with open(os.path.join(self.expert_path, ".autologue.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _replace_json(self, target_file: str, data):
+        # Write then rename so readers never see a partial file
+        tmp_file = f"{target_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, target_file)
+
+    def _replace_csv(self, target_file: str, frame: pd.DataFrame):
+        tmp_file = f"{target_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        frame.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, target_file)
+
     def process_multiple_files(self):
-        for file in os.listdir(self.input_path):
-            self.input_file = os.path.join(self.input_path, file)
-            filename_without_ext = os.path.splitext(file)[0]
-            self.category = filename_without_ext.removeprefix("input_")
-            self.output_file = os.path.join(self.output_path, f"output_{self.category}.csv")
+        for self.input_file, self.output_file in self._input_files():
+            self.category = os.path.splitext(os.path.basename(self.input_file))[0].removeprefix("input_")
             logging.info(f"✅ Researching informations for: {self.category} \n")
             self.process_file()
 
     def process_file(self):
-        full_df = pd.read_table(self.input_file)
-        full_df = full_df.map(lambda x: str(x).strip() if pd.notnull(x) else x)
-        in_df = full_df.copy()
-        in_df.drop(["id", "model", "description", "price", "length_cm", "height_cm", "width_cm", "weight_kg", "technical_specs", "technical_doc", "supercategory"], axis=1, inplace=True, errors="ignore")
-        for index, row in in_df.iterrows():
-            instrument_data = object.__new__(InstrumentData)
-            instrument_data.confidence_score = 0
-            instrument_data.llm2llm_score = 0
-            instrument_data.retries_number = 0
-            instrument_data.id = str(full_df.iloc[index, 0])
-            instrument_data.name = str(full_df.iloc[index, 1])
-            instrument_data.type = str(full_df.iloc[index, 2])
-            instrument_data.model = str(full_df.iloc[index, 3])
-            instrument_data.description = str(full_df.iloc[index, 4])
-            instrument_data.price = str(full_df.iloc[index, 5])
-            instrument_data.dimensions = [str(full_df.iloc[index, 6]), str(full_df.iloc[index, 7]), str(full_df.iloc[index, 8]), str(full_df.iloc[index, 9])]
-            instrument_data.technical_specs = str(full_df.iloc[index, 10])
-            instrument_data.technical_doc = str(full_df.iloc[index, 11])
-            instrument_data.category = str(full_df.iloc[index, 12])
-            if self._process_instrument(instrument_data) == "Error":
+        instruments = self._load_instruments(self.input_file)
+        try:
+            if self._process_batch(instruments, self.output_file) == "Error":
                 logging.error(f"❌ Research failed. \n")
-                break
-        logging.info(f"✅ Researched {len(in_df)} rows → {self.output_file} \n")
+        except BudgetExhausted as e:
+            logging.warning(f"⏹ Research budget exhausted ({e}), stopping. \n")
+            return
+        logging.info(f"✅ Researched {len(instruments)} rows → {self.output_file} \n")
 
-    def _process_instrument(self, instrument_data: InstrumentData):
-        if instrument_data.name in self.context["instruments_processed"]:
-            return "Processed"
-        else:
-            if instrument_data.description in (None, 'nan'):
-                logging.info(f"🔄 Searching a description for {instrument_data.name}.")
-                instrument_data.description = self._chat_perplexity(self.description_prompt, instrument_data.name)
-            if instrument_data.price in (None, 'nan'):
-                logging.info(f"🔄 Searching a price for {instrument_data.name}.")
-                instrument_data.price = self._chat_perplexity(self.price_prompt, instrument_data.name)
-            if instrument_data.dimensions in (None, ['nan', 'nan', 'nan', 'nan']) or "0" in instrument_data.dimensions:
-                logging.info(f"🔄 Searching dimensions for {instrument_data.name}.")
-                for i in range(4):
-                    instrument_data.dimensions[i] = self._chat_perplexity(self.dimensions_prompt[i], instrument_data.name)
-            if instrument_data.technical_specs in (None, '[]', 'nan', {}):
-                logging.info(f"🔄 Searching specifications for {instrument_data.name}.")
-                instrument_data.technical_specs = self._chat_perplexity(self.technical_prompt, instrument_data.name)
-            if instrument_data.technical_doc in (None, 'nan'):
-                logging.info(f"🔄 Searching a documentation for {instrument_data.name}.")
-                instrument_data.technical_doc = self._chat_perplexity(self.documentation_prompt, instrument_data.name)
-            # Test search results
-            if "Error" in (instrument_data.description, instrument_data.price, instrument_data.dimensions[0], instrument_data.dimensions[1], instrument_data.dimensions[2], instrument_data.dimensions[3], instrument_data.technical_specs, instrument_data.technical_doc):
+    def _input_files(self) -> List[tuple]:
+        files = []
+        for file in sorted(os.listdir(self.input_path)):
+            category = os.path.splitext(file)[0].removeprefix("input_")
+            files.append((os.path.join(self.input_path, file), os.path.join(self.output_path, f"output_{category}.csv")))
+        return files
+
+    def _load_instruments(self, input_file) -> List[InstrumentData]:
+        full_df = pd.read_table(input_file)
+        full_df = full_df.map(lambda x: str(x).strip() if pd.notnull(x) else "nan")
+        instruments = []
+        for row in full_df.to_dict("records"):
+            instruments.append(InstrumentData(
+                id=row["id"],
+                name=row["name"],
+                type=row["type"],
+                model=row["model"],
+                description=row["description"],
+                price=row["price"],
+                dimensions=[row[field] for field in dimension_fields],
+                technical_specs=row["technical_specs"],
+                technical_doc=row["technical_doc"],
+                category=row["category_name"],
+                confidence_score=0,
+                llm2llm_score=0,
+                retries_number=0,
+                is_published=self._parse_flag(row.get("is_published")),
+                push_forward=self._parse_flag(row.get("push_forward")),
+                base_price_per_day=self._parse_price(row.get("base_price_per_day"))
+            ))
+        if self.refresh_fields and self.session_id != "default":
+            self._apply_catalogue(instruments, input_file)
+        return instruments
+
+    def _apply_catalogue(self, instruments: List[InstrumentData], input_file):
+        """Take every field but the refreshed ones from the default catalogue, so only those are researched"""
+        category = os.path.splitext(os.path.basename(input_file))[0].removeprefix("input_")
+        catalogue_file = os.path.join(self.default_paths["outputs"], f"output_{category}.csv")
+        if not os.path.isfile(catalogue_file):
+            return
+        catalogue = pd.read_csv(catalogue_file, dtype=str, keep_default_na=False).drop_duplicates("id", keep="last")
+        rows = {row["id"]: row for row in catalogue.to_dict("records")}
+        for instrument_data in instruments:
+            row = rows.get(str(instrument_data.id))
+            # Instruments missing from the catalogue are researched in full
+            if row is None:
+                continue
+            for field_name in research_fields:
+                value = str(row.get(field_name, "")).strip()
+                if field_name in self.refresh_fields or value in ("N/A", *missing_values):
+                    self._set_field(instrument_data, field_name, "nan")
+                elif field_name == "technical_specs":
+                    self._set_field(instrument_data, field_name, self._parse_catalogue_specs(value))
+                else:
+                    self._set_field(instrument_data, field_name, value)
+
+    def _parse_catalogue_specs(self, value: str):
+        # Output files hold the Python form of the specifications dict
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return value
+
+    def _parse_flag(self, value) -> bool:
+        return str(value).strip().lower() in ('true', 't', '1', '1.0', 'yes')
+
+    def _parse_price(self, value) -> float:
+        try:
+            price = float(str(value).replace(',', '.'))
+        except ValueError:
+            return 0.0
+        return 0.0 if math.isnan(price) else price
+
+    def _process_batch(self, batch: List[InstrumentData], output_file: str):
+        pending = [instrument_data for instrument_data in batch if instrument_data.name not in self.context["instruments_processed"]]
+        if self.knowledge_enabled:
+            self._recall_knowledge(pending)
+        if self.semantic_enabled:
+            self._recall_similar(pending)
+        exhausted = None
+        while pending and exhausted is None:
+            # Research every pending row, then validate them together
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                states = list(pool.map(self._research_instrument, pending))
+            if "Error" in states:
                 return "Error"
-            if self._validate_instrument_data(instrument_data):
-                self._update_context(instrument_data, True)
-                instrument_data.confidence_score = self._verif_confidence(instrument_data)
-                instrument_data.llm2llm_score = 0.0 #self._verif_llm2llm(instrument_data)
-                logging.info(f"✅ {instrument_data.name} processed. \n")
-                self._write_instrument(instrument_data, self.output_file)
-            else:
+            # Rows researched before the budget ran out are paid for: validate and write them, then stop
+            exhausted = next((state for state in states if isinstance(state, BudgetExhausted)), None)
+            if exhausted is not None:
+                unfinished = sum(isinstance(state, BudgetExhausted) for state in states)
+                logging.warning(f"⏹ Research budget exhausted, {unfinished} rows left for the next run. \n")
+                pending = [instrument_data for instrument_data, state in zip(pending, states) if not isinstance(state, BudgetExhausted)]
+                if not pending:
+                    break
+            validity = self._validate_batch(pending)
+            retry = []
+            processed = []
+            for instrument_data, valid in zip(pending, validity.to_dict("records")):
+                if all(valid.values()):
+                    self._update_context(instrument_data, True)
+                    instrument_data.confidence_score = self._verif_confidence(instrument_data)
+                    processed.append(instrument_data)
+                    continue
                 self._update_context(instrument_data, False)
                 instrument_data.retries_number = self._check_retries(instrument_data)
+                instrument_data.confidence_score = 0.0
+                instrument_data.llm2llm_score = 0.0
                 if instrument_data.retries_number > 4:
-                    instrument_data.confidence_score = 0.0
-                    instrument_data.llm2llm_score = 0.0
                     logging.error(f"❌ Research for {instrument_data.name} incomplete, exitting. \n")
-                    self._write_instrument(instrument_data, self.output_file)
+                    self._write_instrument(instrument_data, output_file)
                 else:
-                    instrument_data.confidence_score = 0.0
-                    instrument_data.llm2llm_score = 0.0
                     logging.warning(f"❎ Research for {instrument_data.name} failed, retrying... \n")
                     self._write_instrument(instrument_data, self.errors_file)
-                    # Relaunch search
-                    self._process_instrument(instrument_data)
-
-    def _validate_instrument_data(self, instrument_data: InstrumentData) -> bool:
-        instrument_data.description = self._extract_first_paragraph(instrument_data.description)
-        instrument_data.price = self._extract_last_number(instrument_data.price)
-        instrument_data.dimensions[0] = self._extract_last_number(instrument_data.dimensions[0])
-        instrument_data.dimensions[1] = self._extract_last_number(instrument_data.dimensions[1])
-        instrument_data.dimensions[2] = self._extract_last_number(instrument_data.dimensions[2])
-        instrument_data.dimensions[3] = self._extract_last_number(instrument_data.dimensions[3])
-        instrument_data.technical_specs = self._extract_last_json(instrument_data.technical_specs)
-        instrument_data.technical_doc = self._extract_last_url(instrument_data.technical_doc)
-        if instrument_data.description is None:
-            return False
-        if instrument_data.price is None:
-            return False
-        if instrument_data.dimensions is None:
-            return False
-        if None in instrument_data.dimensions:
-            return False
-        if "0" in instrument_data.dimensions:
-            return False
-        if instrument_data.technical_specs is None:
-            return False
-        if instrument_data.technical_specs == {}:
-            return False
-        if instrument_data.technical_doc is None:
+                    # Relaunch search on the fields that failed validation
+                    self._discard_fields(instrument_data, [field for field, ok in valid.items() if not ok])
+                    retry.append(instrument_data)
+            # Grade the validated rows of the round together
+            scores = self._score_llm2llm(processed) if self.llm2llm_enabled else [0.0] * len(processed)
+            for instrument_data, llm2llm_score in zip(processed, scores):
+                instrument_data.llm2llm_score = llm2llm_score
+                logging.info(f"✅ {instrument_data.name} processed. \n")
+                self._write_instrument(instrument_data, output_file)
+            if self.knowledge_enabled and processed:
+                self._remember_knowledge(processed)
+            if self.semantic_enabled and processed:
+                self._remember_similar(processed)
+            pending = retry
+        if exhausted is not None:
+            raise exhausted
+
+    def _research_instrument(self, instrument_data: InstrumentData):
+        try:
+            return self._process_instrument(instrument_data)
+        except BudgetExhausted as e:
+            return e
+
+    def _process_instrument(self, instrument_data: InstrumentData):
+        if instrument_data.name in self.context["instruments_processed"]:
+            return "Processed"
+        if self._is_missing(instrument_data.description):
+            logging.info(f"🔄 Searching a description for {instrument_data.name}.")
+            instrument_data.description = self._chat_perplexity(self.description_prompt, instrument_data.name, 'description')
+        if self._is_missing(instrument_data.price):
+            logging.info(f"🔄 Searching a price for {instrument_data.name}.")
+            instrument_data.price = self._chat_perplexity(self.price_prompt, instrument_data.name, 'price')
+        # Specifications first, they often give the size and weight already
+        if self._is_missing(instrument_data.technical_specs):
+            logging.info(f"🔄 Searching specifications for {instrument_data.name}.")
+            instrument_data.technical_specs = self._chat_perplexity(self.technical_prompt, instrument_data.name, 'technical_specs')
+        self._derive_dimensions(instrument_data)
+        for i in range(4):
+            if self._is_missing(instrument_data.dimensions[i]):
+                logging.info(f"🔄 Searching {dimension_fields[i]} for {instrument_data.name}.")
+                instrument_data.dimensions[i] = self._chat_perplexity(self.dimensions_prompt[i], instrument_data.name, dimension_fields[i])
+        if self._is_missing(instrument_data.technical_doc):
+            logging.info(f"🔄 Searching a documentation for {instrument_data.name}.")
+            instrument_data.technical_doc = self._chat_perplexity(self.documentation_prompt, instrument_data.name, 'technical_doc')
+        # Test search results
+        if "Error" in (instrument_data.description, instrument_data.price, *instrument_data.dimensions, instrument_data.technical_specs, instrument_data.technical_doc):
+            return "Error"
+
+    def _recall_knowledge(self, batch: List[InstrumentData]):
+        """Fill missing fields from the knowledge graph before any web research"""
+        candidates = {}
+        for instrument_data in batch:
+            for name in (instrument_data.name, instrument_data.model):
+                if isinstance(name, str) and not self._is_missing(name.strip()) and name.strip() != "N/A":
+                    candidates.setdefault(name.strip(), []).append(instrument_data)
+        if not candidates:
+            return
+        try:
+            # Exact names only, a search would also match neighbouring models
+            graph = self.M_client.open_nodes(sorted(candidates))
+        except Exception as e:
+            logging.warning(f"⚠️ Knowledge graph unavailable, researching every field: {e}")
+            return
+        entities = graph.get("entities", []) if isinstance(graph, dict) else []
+        recalled = 0
+        for entity in entities:
+            facts = self._parse_observations(entity.get("observations", []))
+            for instrument_data in candidates.get(str(entity.get("name", "")).strip(), []):
+                for field_name, value in facts.items():
+                    if self._is_missing(self._get_field(instrument_data, field_name)):
+                        self._set_field(instrument_data, field_name, value)
+                        instrument_data.known_fields[field_name] = value
+                        recalled += 1
+        if recalled:
+            logging.info(f"🧠 {recalled} fields recalled from the knowledge graph. \n")
+
+    def _remember_knowledge(self, batch: List[InstrumentData]):
+        """Store validated fields as 'field: value (confiance: score, date: YYYY-MM-DD)' observations"""
+        entities, observations = [], []
+        today = datetime.now().strftime("%Y-%m-%d")
+        for instrument_data in batch:
+            contents = []
+            for field_name in research_fields:
+                value = self._format_fact(self._get_field(instrument_data, field_name))
+                if value is not None and instrument_data.known_fields.get(field_name) != value:
+                    contents.append(f"{field_name}: {value} (confiance: {self._fact_confidence(instrument_data, field_name)}, date: {today})")
+            if contents:
+                entities.append({"name": instrument_data.name, "entityType": "instrument", "observations": []})
+                observations.append({"entityName": instrument_data.name, "contents": contents})
+        if not observations:
+            return
+        try:
+            self.M_client.batch([
+                {"type": "create_entities", "entities": entities},
+                {"type": "add_observations", "observations": observations},
+            ], stop_on_error=True)
+        except Exception as e:
+            logging.warning(f"⚠️ Failed to store research in the knowledge graph: {e}")
+
+    def _recall_similar(self, batch: List[InstrumentData]):
+        """Fill missing fields from the closest validated listing of the same product"""
+        thresholds = {field_name: self.query_profiles[field_name]["semantic"] for field_name in research_fields if self.query_profiles[field_name]["semantic"] is not None}
+        targets = [instrument_data for instrument_data in batch if any(self._is_missing(self._get_field(instrument_data, field_name)) for field_name in thresholds)]
+        if not targets:
+            return
+        matches = self.semantic.nearest([instrument_data.name for instrument_data in targets], [instrument_data.category for instrument_data in targets], min(thresholds.values()))
+        for instrument_data, match in zip(targets, matches):
+            if match is None:
+                continue
+            neighbour, facts, similarity = match
+            # Each field has its own bar, prices differ between variants more than descriptions
+            reused = [field_name for field_name, value in facts.items() if similarity >= thresholds.get(field_name, np.inf) and self._is_missing(self._get_field(instrument_data, field_name))]
+            for field_name in reused:
+                self._set_field(instrument_data, field_name, facts[field_name])
+            instrument_data.reused_fields.update(reused)
+            if reused:
+                logging.info(f"🧬 {instrument_data.name} ≈ {neighbour} ({similarity:.3f}), reusing {', '.join(reused)}. \n")
+
+    def _remember_similar(self, batch: List[InstrumentData]):
+        records = []
+        for instrument_data in batch:
+            # Only researched fields: a reused one would chain listings further and further from the original
+            facts = {field_name: self._format_fact(self._get_field(instrument_data, field_name)) for field_name in research_fields if field_name not in instrument_data.reused_fields}
+            records.append((instrument_data.name, instrument_data.category, {field_name: value for field_name, value in facts.items() if value is not None}))
+        self.semantic.add(records)
+        self.semantic.save()
+
+    def _parse_observations(self, observations: List[str]) -> Dict[str, str]:
+        # Latest confident and fresh enough observation of each field wins
+        facts = {}
+        for observation in observations:
+            match = re.match(r'^\s*(\w+)\s*:\s*(.*?)\s*(?:\(confiance\s*:\s*(\d+(?:[.,]\d+)?)(?:\s*,\s*date\s*:\s*(\d{4}-\d{2}-\d{2}))?\))?\s*$', str(observation), re.DOTALL)
+            if not match or match.group(1) not in research_fields or not match.group(2):
+                continue
+            field_name = match.group(1)
+            confidence = float(match.group(3).replace(',', '.')) if match.group(3) else 0.0
+            if confidence < self._knowledge_threshold(field_name):
+                continue
+            if field_name in self.knowledge_max_age:
+                # Undated observations predate expiry and are never trusted for these fields
+                if not match.group(4) or datetime.now() - datetime.strptime(match.group(4), "%Y-%m-%d") > self.knowledge_max_age[field_name]:
+                    continue
+            facts[field_name] = match.group(2)
+        return facts
+
+    def _knowledge_threshold(self, field_name: str) -> float:
+        return self.knowledge_llm2llm if field_name in text_fields and self.llm2llm_enabled else self.knowledge_confidence
+
+    def _fact_confidence(self, instrument_data: InstrumentData, field_name: str) -> float:
+        # The confidence score only looks at prices and dimensions, texts are judged by their llm2llm notes
+        return instrument_data.llm2llm_score if field_name in text_fields and self.llm2llm_enabled else instrument_data.confidence_score
+
+    def _format_fact(self, value) -> Optional[str]:
+        if self._is_missing(value) or value == "Error":
+            return None
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return str(value)
+
+    def _get_field(self, instrument_data: InstrumentData, field_name: str):
+        if field_name in dimension_fields:
+            return instrument_data.dimensions[dimension_fields.index(field_name)]
+        return getattr(instrument_data, field_name)
+
+    def _set_field(self, instrument_data: InstrumentData, field_name: str, value):
+        if field_name in dimension_fields:
+            instrument_data.dimensions[dimension_fields.index(field_name)] = value
+        else:
+            setattr(instrument_data, field_name, value)
+
+    def _derive_dimensions(self, instrument_data: InstrumentData):
+        """Fill missing dimensions and weight from the specifications, converted to cm and kg"""
+        missing = [field_name for field_name in dimension_fields if self._is_missing(self._get_field(instrument_data, field_name))]
+        specs = self._extract_last_json(instrument_data.technical_specs) if missing else None
+        if not isinstance(specs, dict):
+            return
+        derived = {}
+        for key, value in self._flatten_specs(specs):
+            name = key.lower()
+            if re.search(spec_excluded, name):
+                continue
+            if re.search(r'dimension|taille|size|encombrement', name):
+                derived.update({field_name: measure for field_name, measure in self._parse_dimensions(key, str(value)).items() if field_name not in derived})
+                continue
+            for field_name, pattern in spec_keys.items():
+                if field_name not in derived and re.search(pattern, name):
+                    measure = self._parse_measure(str(value), weight_units if field_name == 'weight_kg' else length_units, key)
+                    if measure:
+                        derived[field_name] = measure
+                    break
+        found = [field_name for field_name in missing if field_name in derived]
+        for field_name in found:
+            self._set_field(instrument_data, field_name, str(round(derived[field_name], 2)))
+        if found:
+            logging.info(f"📐 {', '.join(found)} derived from the specifications of {instrument_data.name}.")
+
+    def _flatten_specs(self, specs: dict, prefix: str = ""):
+        for key, value in specs.items():
+            if isinstance(value, dict):
+                yield from self._flatten_specs(value, f"{prefix}{key} ")
+            else:
+                yield f"{prefix}{key}", value
+
+    def _parse_measure(self, text: str, units: Dict[str, float], key: str = "") -> Optional[float]:
+        text = text.lower()
+        # '1 m 20' or '1m20' is one length
+        if 'm' in units:
+            match = re.match(r'\s*(\d+)\s*m\s*(\d{1,2})(?![\d.,])', text)
+            if match:
+                return int(match.group(1)) * units['m'] + int(match.group(2).ljust(2, '0'))
+        # First number with a unit, which must be one of ours: '3.2 kg (7 lbs)' gives 3.2, '60 à 90 cm' or '50 Hz' nothing
+        for number, unit in re.findall(rf'({number_pattern})\s*((?:mm|cm|m|inches|inch|in|pouces|kg|g|lbs|lb|livres|oz)(?![a-zà-ÿ])|"|\'\'|[a-zà-ÿ%]+)?', text):
+            if not unit:
+                continue
+            if unit not in units:
+                return None
+            value = self._to_number(number) * units[unit]
+            return value if value > 0 else None
+        # A bare number takes the unit written in the key: 'Poids (kg)', 'Weight in lbs'
+        match = re.search(r'[\(\[]\s*([a-z"]+)\s*[\)\]]|\b(?:en|in)\s+([a-z]+)\b', key.lower())
+        unit = match and (match.group(1) or match.group(2))
+        number = re.search(number_pattern, text)
+        if unit in units and number:
+            value = self._to_number(number.group(0)) * units[unit]
+            return value if value > 0 else None
+        return None
+
+    def _to_number(self, number: str) -> float:
+        return float(re.sub(r'[ \u00a0\u202f]', '', number).replace(',', '.'))
+
+    def _parse_dimensions(self, key: str, text: str) -> Dict[str, float]:
+        """'L x l x H', 'W x H x D' or plain 'a x b x c mm' (read as width x height x depth)"""
+        term = rf'({number_pattern})\s*([a-z"]+)?\s*'
+        match = re.search(rf'{term}[x×]\s*{term}[x×]\s*{term}', text.lower())
+        if not match:
+            return {}
+        numbers, units = match.groups()[0::2], list(match.groups()[1::2])
+        # Axis letters written after a number are not units
+        units = [None if unit in ('l', 'w', 'h', 'd', 'p') else unit for unit in units]
+        # The trailing unit only applies to terms without their own ('19" x 2U x 10"' is not three lengths)
+        unit = units[2] or next((unit for unit in ('mm', 'cm', 'in', 'm') if re.search(rf'\b{unit}\b', f"{key} {text}".lower())), None)
+        units = [own or unit for own in units]
+        if any(own not in length_units for own in units):
+            return {}
+        values = [self._to_number(number) * length_units[own] for number, own in zip(numbers, units)]
+        # Axis letters, from the key or the value; lower-case l is the French largeur
+        letters = re.findall(r'\b([LlWHDP])\b\s*[x×]?', f"{key} {text}")
+        axes = {'L': 'length_cm', 'D': 'length_cm', 'P': 'length_cm', 'l': 'width_cm', 'W': 'width_cm', 'H': 'height_cm'}
+        order = [axes[letter] for letter in letters[:3]] if len(letters) >= 3 else ['width_cm', 'height_cm', 'length_cm']
+        if len(set(order)) != 3:
+            return {}
+        return {field_name: value for field_name, value in zip(order, values) if value > 0}
+
+    def _is_missing(self, value) -> bool:
+        return value is None or (isinstance(value, str) and value in missing_values) or value in ({}, [])
+
+    def _discard_fields(self, instrument_data: InstrumentData, fields: List[str]):
+        instrument_data.extracted_fields.difference_update(fields)
+        instrument_data.reused_fields.difference_update(fields)
+        for field in fields:
+            if field in dimension_fields:
+                instrument_data.dimensions[dimension_fields.index(field)] = None
+            else:
+                setattr(instrument_data, field, None)
+
+    def _extract_instrument_data(self, instrument_data: InstrumentData):
+        for field_name in research_fields:
+            if field_name in instrument_data.extracted_fields:
+                continue
+            answer = self._get_field(instrument_data, field_name)
+            value = self._parse_answer(field_name, answer)
+            if value is None and self._routes_locally(field_name, answer):
+                value = self._extract_locally(field_name, answer)
+            self._set_field(instrument_data, field_name, value)
+            if value is not None:
+                instrument_data.extracted_fields.add(field_name)
+
+    def _parse_answer(self, field_name: str, answer):
+        if field_name == "description":
+            return self._extract_first_paragraph(answer)
+        if field_name == "price" or field_name in dimension_fields:
+            return self._normalize_number(self._extract_last_number(answer))
+        if field_name == "technical_specs":
+            return self._extract_last_json(answer)
+        return self._extract_last_url(answer)
+
+    def _routes_locally(self, field_name: str, answer) -> bool:
+        if not isinstance(answer, str) or answer.strip() in missing_values or answer == "Error":
             return False
-        if not self._expert_filter(instrument_data):
+        # Prices and dimensions are only parsed from the web answer, the local model could not back up a number
+        if field_name == "price" or field_name in dimension_fields:
             return False
-        return True
+        return self.query_profiles[field_name]["local"] and self.local_available and self.scorer.available
+
+    def _extract_locally(self, field_name: str, answer: str):
+        """Let the local model extract or rewrite the web answer, kept only when it checks out against it"""
+        profile = self.query_profiles[field_name]
+        prompt = local_prompts.get(profile["format"], local_prompts["text"]).format(field=field_name, text=answer)
+        try:
+            response = self._chat_llama_with_retry(prompt, max_retries=2, model=profile["local_model"])
+        except Exception:
+            return None
+        value = self._parse_answer(field_name, response)
+        # The local model has no web access: the link must come from the web answer, where it was written without its scheme
+        if field_name == "technical_doc" and value is not None and re.sub(r'^https?://', '', value).rstrip('/.') not in answer:
+            value = None
+        logging.info(f"🏠 {field_name} {'extracted locally' if value is not None else 'left for a new web search'}")
+        return value
+
+    def _validate_batch(self, batch: List[InstrumentData]) -> pd.DataFrame:
+        for instrument_data in batch:
+            self._extract_instrument_data(instrument_data)
+        frame = pd.DataFrame({
+            "description": [instrument_data.description for instrument_data in batch],
+            "price": [instrument_data.price for instrument_data in batch],
+            **{field: [instrument_data.dimensions[i] for instrument_data in batch] for i, field in enumerate(dimension_fields)},
+            "technical_specs": [instrument_data.technical_specs for instrument_data in batch],
+            "technical_doc": [instrument_data.technical_doc for instrument_data in batch],
+            "category": [instrument_data.category for instrument_data in batch],
+        })
+        numbers = frame[["price"] + dimension_fields].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        low = frame["category"].map(self.price_bands["min"]).fillna(-np.inf).to_numpy(dtype=float)
+        high = frame["category"].map(self.price_bands["max"]).fillna(np.inf).to_numpy(dtype=float)
+        # One boolean column per researched field, one row per instrument
+        validity = pd.DataFrame(index=frame.index)
+        validity["description"] = frame["description"].notna().to_numpy()
+        validity["price"] = ~np.isnan(numbers[:, 0]) & (numbers[:, 0] >= low) & (numbers[:, 0] <= high)
+        for i, field in enumerate(dimension_fields):
+            validity[field] = ~np.isnan(numbers[:, i + 1]) & (numbers[:, i + 1] != 0)
+        validity["technical_specs"] = np.fromiter((isinstance(specs, (dict, list)) and len(specs) > 0 for specs in frame["technical_specs"]), dtype=bool, count=len(frame))
+        validity["technical_doc"] = frame["technical_doc"].notna().to_numpy()
+        # Dead or hallucinated documentation links fail like any other field
+        if self.check_links and validity["technical_doc"].any():
+            urls = frame["technical_doc"].where(validity["technical_doc"], None).tolist()
+            validity["technical_doc"] &= np.array(self.link_checker.check_many(urls), dtype=bool)
+        return validity
 
     def _verif_confidence(self, instrument_data: InstrumentData) -> float:
         compute_score = 100.0
@@ -265,47 +898,33 @@ class Expert():
         return confidence_score
 
     def _verif_llm2llm(self, instrument_data: InstrumentData) -> float:
-        compute_score = 100.0
-        # Description analysis
-        try:
-            prompt = f"""Donne une note sur 33 à cette description de produit: {instrument_data.description}"""
-            response = self._chat_llama_with_retry(prompt, 3)
-            desc_note = float(self._extract_last_number(response))
-            logging.info(f"Description score: {desc_note}")
-        except Exception as e:
-            logging.error(f"Error analyzing description: {e}")
-            desc_note = 33
-        # Technical analysis
-        try:
-            prompt = f"""Donne une note sur 33 à cette spécification technique de produit: {instrument_data.technical_specs}"""
-            response = self._chat_llama_with_retry(prompt, 3)
-            tech_note = float(self._extract_last_number(response))
-            logging.info(f"Specs score: {tech_note}")
-        except Exception as e:
-            logging.error(f"Error analyzing specifications: {e}")
-            tech_note = 33
-        # Documentation analysis
-        try:
-            response = requests.get(instrument_data.technical_doc)
-            html = response.text
-            prompt = f"""Donne une note sur 33 à cette documentation de produit: {html}"""
-            response = self._chat_llama_with_retry(prompt, 3)
-            doc_note = float(self._extract_last_number(response))
-            logging.info(f"Doc score: {doc_note}")
-        except Exception as e:
-            logging.error(f"Error analyzing documentation: {e}")
-            doc_note = 33
-        compute_score -= (desc_note + tech_note + doc_note)
-        llm2llm_score = max(0.0, compute_score)
-        llm2llm_score = min(llm2llm_score, 100)
-        llm2llm_score = round(confidence_score, 2)
-        return llm2llm_score
-        
-    def _chat_perplexity(self, prompt, instrument) -> str:
+        return self._score_llm2llm([instrument_data])[0]
+
+    def _score_llm2llm(self, instruments: List[InstrumentData]) -> List[float]:
+        # Queue every grading of the batch at once, the service runs them on its pool
+        jobs = []
+        for instrument_data in instruments:
+            jobs.append({
+                "description": self.scorer.submit("description", str(instrument_data.description)),
+                "technical_specs": self.scorer.submit("technical_specs", json.dumps(instrument_data.technical_specs, ensure_ascii=False)),
+                "technical_doc": self.scorer.submit_document(instrument_data.technical_doc, self._fetch_documentation),
+            })
+        return self.scorer.score_many(jobs)
+
+    def _fetch_documentation(self, url: str) -> Optional[str]:
+        return self.fetcher.fetch_text(url)
+
+    def _chat_perplexity(self, prompt, instrument, field: Optional[str] = None) -> str:
+        key = hashlib.sha256(json.dumps([self.agent_prompt, prompt, str(instrument)]).encode("utf-8")).hexdigest()
+        return self.inflight.do(key, self._request_perplexity, prompt, instrument, field)
+
+    def _request_perplexity(self, prompt, instrument, field: Optional[str] = None) -> str:
         max_retries = 3
+        # The tunnel is only mentioned when an external party really calls the bridge
+        bridge_url = f" grâce à cet URL : {self.public_bridge_url}" if self.public_bridge_url else ""
         system_parts = [
             self.agent_prompt,
-            f"\n## Utilise les outils de mémorisation de la section 'tools' grâce à cet URL : https://fattily-synetic-arnold.ngrok-free.dev pour enregistrer de manière persistantes tes connaissances et ainsi améliorer ton expertise.",
+            f"\n## Utilise les outils de mémorisation de la section 'tools'{bridge_url} pour enregistrer de manière persistantes tes connaissances et ainsi améliorer ton expertise.",
         ]
         if prompt:
             system_parts.append(f"\n## Tâche de recherche : \n{prompt}")
@@ -314,38 +933,34 @@ class Expert():
             {"role": "user", "content": str(instrument)}
         ]
         try:
-            result = self.P_client.chat.completions.create(
-                model="sonar-pro",
-                messages=messages,
-                tools=self.tools,
-                max_tokens=300
-            )
-            # Handle tool calls in a loop
+            result = self._create_completion(messages, field=field)
+            # Every tool call of a round goes to the bridge at once, then a single follow-up completion
+            rounds = 0
             while result.choices[0].message.tool_calls:
-                tool_call = result.choices[0].message.tool_calls[0]
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
-                # Execute the tool via the bridge
-                logging.info(f"Executing tool: {tool_name} with args: {tool_args}")
-                tool_result = execute_tool(tool_name, tool_args)
-                # Add assistant's tool use to messages
+                tool_calls = result.choices[0].message.tool_calls
+                if rounds >= self.max_tool_rounds:
+                    logging.warning(f"⚠️ {len(tool_calls)} tool calls left after {rounds} rounds, asking for the answer")
+                    result = self._create_completion(messages, use_tools=False, field=field)
+                    break
+                rounds += 1
+                logging.info(f"Executing tools: {[tool_call.function.name for tool_call in tool_calls]}")
+                tool_results = self._execute_tools(tool_calls)
                 messages.append({
                     "role": "assistant",
-                    "content": result.choices[0].message.content or ""
+                    "content": result.choices[0].message.content or "",
+                    "tool_calls": [{
+                        "id": tool_call.id,
+                        "type": "function",
+                        "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments}
+                    } for tool_call in tool_calls]
                 })
-                # Add tool result to messages
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": tool_result  # ← The actual tool result, not the URL
-                })
-                # Continue the conversation with the tool result
-                result = self.P_client.chat.completions.create(
-                    model="sonar-pro",
-                    messages=messages,
-                    tools=self.tools,
-                    max_tokens=300
-                )
+                for tool_call, tool_result in zip(tool_calls, tool_results):
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "content": tool_result
+                    })
+                result = self._create_completion(messages, field=field)
             # Extract final text response
             if result.choices and len(result.choices) > 0:
                 full_response = result.choices[0].message.content
@@ -366,20 +981,153 @@ class Expert():
                     return full_response
             return None
             
+        except BudgetExhausted:
+            raise
         except Exception as e:
             logging.error(f"Error in _chat_perplexity: {type(e).__name__}: {e}")
             return "Error"
 
-    def _chat_llama_with_retry(self, prompt, max_retries=3):
+    def _create_completion(self, messages, use_tools: bool = True, field: Optional[str] = None):
+        if self.hedging is None:
+            return self._request_completion(messages, use_tools, field)
+        return self.hedging.run(field or "default", lambda cancel: self._request_completion(messages, use_tools, field, cancel), self._has_answer)
+
+    def _request_completion(self, messages, use_tools: bool = True, field: Optional[str] = None, cancel: Optional[threading.Event] = None):
+        self.budget.reserve()
+        profile = self.query_profiles.get(field, self.query_profiles["default"])
+        options = self._completion_options(profile, use_tools)
+        if self.streaming and profile["format"] != "text":
+            return self._stream_completion(messages, options, field, profile["format"], cancel)
+        result = self.P_client.chat.completions.create(messages=messages, **options)
+        usage = getattr(result, "usage", None)
+        if usage is not None:
+            self.budget.charge(getattr(usage, "total_tokens", 0) or 0)
+        return result
+
+    def _has_answer(self, result) -> bool:
+        if not getattr(result, "choices", None):
+            return False
+        message = result.choices[0].message
+        return bool(message.content or message.tool_calls)
+
+    def _completion_options(self, profile: dict, use_tools: bool) -> dict:
+        options = {"model": profile["model"], "max_tokens": profile["max_tokens"]}
+        if profile.get("temperature") is not None:
+            options["temperature"] = profile["temperature"]
+        if profile.get("stop"):
+            options["stop"] = profile["stop"]
+        if profile.get("response_format"):
+            options["response_format"] = profile["response_format"]
+        if use_tools and profile["tools"]:
+            options["tools"] = self.tools
+        return options
+
+    def _stream_completion(self, messages, options: dict, field: str, answer_format: str, cancel: Optional[threading.Event] = None):
+        """Stream the completion and close it as soon as the answer for the field is complete"""
+        stream = self.P_client.chat.completions.create(messages=messages, stream=True, **options)
+        content, tool_calls, usage, complete = "", [], None, False
+        try:
+            for chunk in stream:
+                # The hedged twin already answered
+                if cancel is not None and cancel.is_set():
+                    break
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                content += self._message_text(getattr(delta, "content", None))
+                for tool_call in getattr(delta, "tool_calls", None) or []:
+                    self._merge_tool_call(tool_calls, tool_call)
+                # A pending tool call needs the full stream
+                end = None if tool_calls else self._answer_end(answer_format, content)
+                if end is not None:
+                    # Keep the text up to the first complete answer, the extractors take the last one
+                    content, complete = content[:end], True
+                    break
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+        if usage is not None:
+            self.budget.charge(getattr(usage, "total_tokens", 0) or 0)
+        else:
+            # Closed early, the usage chunk never came
+            self.budget.charge(sum(len(str(message.get("content", ""))) for message in messages) // 4 + len(content) // 4)
+        if complete:
+            logging.info(f"⏩ {field} answer complete after {len(content)} characters, stream closed")
+        message = SimpleNamespace(content=content, tool_calls=tool_calls or None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def _message_text(self, content) -> str:
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(getattr(part, "text", "") or "" for part in content)
+        return ""
+
+    def _merge_tool_call(self, tool_calls: list, tool_call):
+        # Tool calls arrive in pieces, a new id starts a new call and arguments are appended
+        function = getattr(tool_call, "function", None)
+        if getattr(tool_call, "id", None) and (not tool_calls or tool_calls[-1].id != tool_call.id):
+            tool_calls.append(SimpleNamespace(id=tool_call.id, function=SimpleNamespace(name="", arguments="")))
+        if not tool_calls or function is None:
+            return
+        if getattr(function, "name", None):
+            tool_calls[-1].function.name = function.name
+        tool_calls[-1].function.arguments += getattr(function, "arguments", None) or ""
+
+    def _answer_end(self, answer_format: str, text: str) -> Optional[int]:
+        """End of the first complete answer in the streamed text, None while it is incomplete"""
+        if answer_format == "number":
+            # A bold number, or a first line holding only the number once the line is finished
+            match = re.search(r'\*\*\d+(?:[.,]\d+)?\*\*', text) or re.match(r'\s*\d+(?:[.,]\d+)?\s*(?:€|kg|cm)?[ \t]*\n', text)
+            return match.end() if match else None
+        if answer_format == "json":
+            return self._json_end(text)
+        if answer_format == "url":
+            # The URL is complete once something follows it
+            match = re.search(r'https?://[^\s*\)\]\}]+[\s*\)\]\}]', text)
+            return match.end() if match else None
+        return None
+
+    def _json_end(self, text: str) -> Optional[int]:
+        """End of the first top-level JSON object of the text, None until it is closed"""
+        start = text.find("{")
+        if start < 0:
+            return None
+        depth, in_string, escaped = 0, False, False
+        for position, char in enumerate(text[start:], start):
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    return position + 1
+        return None
+
+    def _chat_llama_with_retry(self, prompt, max_retries=3, model='phi'):
         for attempt in range(max_retries):
             try:
                 message = [{"role": "user", "content": prompt}]
-                chat = self.O_client.chat(model='phi', messages=message)
+                chat = self.O_client.chat(model=model, messages=message, keep_alive=self.scorer.keep_alive)
                 return chat['message']['content']
             except Exception as e:
+                # Retrying an unreachable server only adds backoff, stop local routing for the rest of the run
+                if isinstance(e, (ConnectionError, OSError)) or "connect" in str(e).lower():
+                    self.local_available = False
+                    print(f"❌ Ollama unreachable, local extraction disabled: {e}")
+                    raise
                 if attempt < max_retries - 1:
                     print(f"⚠️ Attempt {attempt + 1} failed: {e}")
-                    time.sleep(2)
+                    time.sleep(2 ** attempt)
                 else:
                     print(f"❌ Failed after {max_retries} attempts: {e}")
                     raise
@@ -392,26 +1140,32 @@ class Expert():
             "failed_searches": [],
             "last_updated": datetime.now().strftime("%d-%m-%y-%Hh%M:%S"),
             }
-        self._save_context(os.path.join(self.source_path, "context.json"))
+        self.context_changes = set()
+        self._save_context(self.context_file, merge=False)
 
     def _update_context(self, instrument_data: InstrumentData, state: bool):
+        self.context_changes.add(instrument_data.name)
         if state:
             self.context["instruments_processed"].append(instrument_data.name)
-            self.context["price_cache"].append(f"{instrument_data.name} : {instrument_data.price}")
-            self.context["dimensions_cache"].append(f"{instrument_data.name} : {instrument_data.dimensions}")
+            # The latest research replaces older values for the instrument
+            for key, value in (("price_cache", instrument_data.price), ("dimensions_cache", instrument_data.dimensions)):
+                self.context[key] = [entry for entry in self.context[key] if entry.split(" : ")[0] != instrument_data.name]
+                self.context[key].append(f"{instrument_data.name} : {value}")
             if instrument_data.name in self.context["failed_searches"]:
                 self.context["failed_searches"].remove(instrument_data.name)
         else:
             if instrument_data.name not in self.context["failed_searches"]:
                 self.context["failed_searches"].append(instrument_data.name)
-        self._save_context(os.path.join(self.source_path, "context.json"))
+        self._save_context(self.context_file)
         
-    def _save_context(self, context_file=None):
+    def _save_context(self, context_file=None, merge: bool = True):
         try:
-            if os.path.isfile(context_file):
-                os.remove(context_file)
-            with open(context_file, "w", encoding="utf-8") as f:
-                json.dump(self.context, f, indent=4, ensure_ascii=False)
+            with self._locked():
+                # A promotion may have landed since the last save: keep it, this run only owns what it researched
+                if merge and os.path.isfile(context_file):
+                    with open(context_file, "r", encoding="utf-8") as f:
+                        self.context = self._merge_context(json.load(f), self.context, self.context_changes)
+                self._replace_json(context_file, self.context)
         except Exception as e:
             logging.error(f"Failed to write context file: {e}")
             return False
@@ -420,19 +1174,30 @@ class Expert():
         if context_file and os.path.isfile(context_file):
             with open(context_file, "r", encoding="utf-8") as f:
                 self.context = json.load(f)
+            self.context_changes = set()
             return self.context
         else:
-            self._reset_context(context_file)
+            self._reset_context()
             return self.context
 
+    def _load_price_bands(self, bands_file=None) -> pd.DataFrame:
+        try:
+            with open(bands_file, "r", encoding="utf-8") as f:
+                bands = json.load(f)
+        except Exception as e:
+            logging.error(f"Failed to read price bands: {e}")
+            bands = {}
+        return pd.DataFrame.from_dict(bands, orient="index", columns=["min", "max"], dtype=float)
+
     def _write_instrument(self, instrument_data: InstrumentData, output_file: str):
         try:
-            file_exists = os.path.isfile(output_file)
-            with open(output_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=self.fieldnames)
-                if not file_exists:
-                    writer.writeheader()
-                writer.writerow(instrument_data.to_csv_dict())
+            with self._locked():
+                file_exists = os.path.isfile(output_file)
+                with open(output_file, 'a', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=self.fieldnames)
+                    if not file_exists:
+                        writer.writeheader()
+                    writer.writerow(instrument_data.to_csv_dict())
             return True
         except Exception as e:
             logging.error(f"Failed to write to output CSV: {e}")
@@ -496,6 +1261,11 @@ class Expert():
                 return para
         return None
 
+    def _normalize_number(self, number: Optional[str]) -> Optional[str]:
+        if number is None:
+            return None
+        return number.replace('€', '').replace(',', '.').strip()
+
     def _extract_last_number(self, text: str) -> Optional[str]:
         if not isinstance(text, str):
             return None
@@ -523,6 +1293,8 @@ class Expert():
     def _extract_last_json(self, text) -> Optional[Dict]:
         if isinstance(text, (dict, list)):
             return text
+        if not isinstance(text, str):
+            return None
         code_block_pattern = r'```(?:json)?\s*(\{[^`]*\})\s*```'
         code_matches = re.findall(code_block_pattern, text, re.DOTALL)
         if code_matches:
@@ -606,6 +1378,37 @@ class Expert():
         else:
             return obj
 
+    def _execute_tools(self, tool_calls) -> List[str]:
+        """Run the tool calls of one completion, graph operations in a single bridge batch"""
+        results: List[Optional[str]] = [None] * len(tool_calls)
+        operations, positions = [], []
+        for index, tool_call in enumerate(tool_calls):
+            tool_name = tool_call.function.name
+            try:
+                tool_args = json.loads(tool_call.function.arguments or "{}")
+            except json.JSONDecodeError as e:
+                results[index] = f"Error: Invalid arguments for '{tool_name}': {e}"
+                continue
+            if not isinstance(tool_args, dict):
+                results[index] = f"Error: Arguments for '{tool_name}' must be a JSON object"
+                continue
+            if tool_name in batch_fields:
+                operations.append({"type": tool_name, **tool_args})
+                positions.append(index)
+            else:
+                results[index] = self._execute_tool(tool_name, tool_args)
+        if operations:
+            try:
+                for position, answer in zip(positions, self.M_client.batch(operations)):
+                    if answer["ok"]:
+                        results[position] = json.dumps(answer["result"])
+                    else:
+                        results[position] = f"Error executing tool '{operations[answer['index']]['type']}': {answer['error']}"
+            except Exception as e:
+                for position, operation in zip(positions, operations):
+                    results[position] = f"Error executing tool '{operation['type']}': {str(e)}"
+        return results
+
     def _execute_tool(self, tool_name: str, tool_input: dict) -> str:
         try:
             result = None
@@ -613,7 +1416,7 @@ class Expert():
             if tool_name == "create_entities":
                 result = self.M_client.create_entities(tool_input["entities"])
             elif tool_name == "delete_entities":
-                result = self.M_client.delete_entities(tool_input["entity_names"])
+                result = self.M_client.delete_entities(tool_input["entityNames"])
             # ============ Relations ============
             elif tool_name == "create_relations":
                 result = self.M_client.create_relations(tool_input["relations"])
@@ -0,0 +1,195 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os, io, re, json, logging, hashlib, threading, time
+from html.parser import HTMLParser
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import pypdf
+except ImportError:  # PDF manuals are then remembered as unreadable
+    pypdf = None
+
+class TextExtractor(HTMLParser):
+
+    # Content of these tags never reaches the prompt
+    skipped_tags = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "iframe"}
+    main_tags = {"main", "article"}
+    block_tags = {"p", "div", "section", "li", "tr", "br", "h1", "h2", "h3", "h4", "h5", "h6", "table", "ul", "ol", "dl", "dt", "dd"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.parts = []
+        self.main_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skipped_tags:
+            self.skip_depth += 1
+        elif tag in self.main_tags:
+            self.main_depth += 1
+        if tag in self.block_tags:
+            self._append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.skipped_tags and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in self.main_tags and self.main_depth:
+            self.main_depth -= 1
+        if tag in self.block_tags:
+            self._append("\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self._append(data)
+
+    def _append(self, text):
+        self.parts.append(text)
+        if self.main_depth:
+            self.main_parts.append(text)
+
+    def text(self) -> str:
+        # Prefer <main>/<article> when the page declares one
+        parts = self.main_parts if "".join(self.main_parts).strip() else self.parts
+        lines = (re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in "".join(parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+class DocumentFetcher():
+
+    def __init__(self, cache_dir: str, connect_timeout: float = 3.05, read_timeout: float = 10, max_bytes: int = 2_000_000, max_chars: int = 6000, pool_size: int = 8, total_timeout: float = 30, session: requests.Session = None, max_pdf_bytes: int = 25_000_000, unreadable_ttl: float = 7 * 86400):
+        self.cache_dir = cache_dir
+        self.timeout = (connect_timeout, read_timeout)
+        self.total_timeout = total_timeout
+        self.max_bytes = max_bytes
+        # A PDF cut short cannot be parsed, its index sits at the end
+        self.max_pdf_bytes = max_pdf_bytes
+        self.unreadable_ttl = unreadable_ttl
+        self.max_chars = max_chars
+        self.lock = threading.Lock()
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": "Mulster-Autologue/1.0"})
+
+    def fetch_text(self, url: str) -> Optional[str]:
+        """Return the main text of a document, revalidating the cached copy when there is one"""
+        if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+            return None
+        cached = self._read_cache(url)
+        # Documents we cannot read are not downloaded again on every run
+        if cached and cached.get("text") is None:
+            if time.time() - cached.get("checked", 0) < self.unreadable_ttl:
+                return None
+            cached = None
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True, allow_redirects=True) as response:
+                if response.status_code == 304 and cached:
+                    return cached["text"]
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                if "pdf" in content_type or urlparse(url).path.lower().endswith(".pdf"):
+                    text = self.extract_pdf_text(self._read_capped(response, self.max_pdf_bytes)) if pypdf is not None else None
+                elif "html" in content_type or "text" in content_type:
+                    body = self._read_capped(response)
+                    encoding = response.encoding if "charset" in content_type.lower() else "utf-8"
+                    text = self.extract_text(body.decode(encoding, errors="replace"), content_type)
+                else:
+                    text = None
+                if not text:
+                    logging.warning(f"Skipping {url}: no readable text in '{content_type}'")
+                    self._write_cache(url, {"url": url, "text": None, "content_type": content_type, "checked": time.time()})
+                    return None
+                self._write_cache(url, {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "text": text,
+                })
+                return text
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Failed to fetch {url}: {e}")
+            # A stale copy is better than nothing when the host is down
+            return cached["text"] if cached else None
+
+    def extract_text(self, body: str, content_type: str = "text/html") -> str:
+        if "html" in content_type:
+            extractor = TextExtractor()
+            extractor.feed(body)
+            extractor.close()
+            text = extractor.text()
+        else:
+            text = re.sub(r"\s+", " ", body).strip()
+        return text[:self.max_chars]
+
+    def extract_pdf_text(self, body: bytes) -> Optional[str]:
+        """Text of the first pages of a PDF, up to max_chars"""
+        try:
+            reader = pypdf.PdfReader(io.BytesIO(body))
+            parts, size = [], 0
+            for page in reader.pages:
+                part = page.extract_text() or ""
+                parts.append(part)
+                size += len(part)
+                if size >= self.max_chars:
+                    break
+        except Exception as e:
+            logging.warning(f"Unreadable PDF: {e}")
+            return None
+        return self.extract_text(" ".join(parts), "text/plain")
+
+    def _read_capped(self, response, max_bytes: Optional[int] = None) -> bytes:
+        max_bytes = max_bytes or self.max_bytes
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            logging.warning(f"{response.url} is {length} bytes, keeping the first {max_bytes}")
+        chunks = []
+        size = 0
+        # The read timeout is per socket read, a trickling host is cut by the overall deadline
+        deadline = time.monotonic() + self.total_timeout
+        for chunk in response.iter_content(chunk_size=65536):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+            if time.monotonic() > deadline:
+                logging.warning(f"{response.url} exceeded {self.total_timeout}s, keeping {size} bytes")
+                break
+        return b"".join(chunks)[:max_bytes]
+
+    def _cache_file(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_cache(self, url: str) -> Optional[dict]:
+        cache_file = self._cache_file(url)
+        if not os.path.isfile(cache_file):
+            return None
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logging.error(f"Failed to read document cache for {url}: {e}")
+            return None
+
+    def _write_cache(self, url: str, entry: dict):
+        try:
+            with self.lock:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            cache_file = self._cache_file(url)
+            tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            logging.error(f"Failed to write document cache for {url}: {e}")
@@ -113,6 +113,9 @@ else
     echo "❌ Failed to pull phi."
     exit 1
 fi
+# Embeddings for the semantic cache, research still runs without them
+echo "Pulling nomic-embed-text model..."
+docker exec llama ollama pull nomic-embed-text || echo "⚠️ Failed to pull nomic-embed-text, semantic cache disabled."
 
 echo -e "🎉 Mulster autologue system ready!\n"
 
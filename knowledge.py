@@ -1,16 +1,33 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from requests.adapters import HTTPAdapter
 from typing import Optional, List, Dict
+from collections import deque
+import urllib3
 import subprocess
+import importlib.util
+import functools
 import requests
+import tempfile
+import shutil
+import socket
 import asyncio
 import uvicorn
 import logging
+import hashlib
+import bisect
+import threading
 import json
 import time
 import os
 import re
 
+try:
+    import httpx
+except ImportError:  # Only AsyncMCPClient needs it, the bridge image does without
+    httpx = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 app = FastAPI(title="MCP Bridge Server")
@@ -43,13 +60,210 @@ def get_ngrok_url(retries: int = 10, delay: float = 1) -> Optional[str]:
     logger.error("Failed to retrieve ngrok URL after all retries")
     return None
 
+# ==================== Transport ====================
+class UnixHTTPConnection(urllib3.connection.HTTPConnection):
+    """HTTP connection over a Unix domain socket"""
+    
+    def __init__(self, socket_path: str, *args, **kwargs):
+        self.socket_path = socket_path
+        super().__init__("localhost", *args, **kwargs)
+    
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout if isinstance(self.timeout, (int, float)) else None)
+        sock.connect(self.socket_path)
+        return sock
+
+class UnixConnectionPool(urllib3.connectionpool.HTTPConnectionPool):
+    
+    def __init__(self, socket_path: str, maxsize: int = 8):
+        super().__init__("localhost", maxsize=maxsize)
+        self.socket_path = socket_path
+    
+    def _new_conn(self):
+        return UnixHTTPConnection(self.socket_path, timeout=self.timeout.connect_timeout)
+
+class UnixAdapter(HTTPAdapter):
+    """Sends every http+unix:// request to the bridge socket"""
+    
+    def __init__(self, socket_path: str, pool_size: int = 8):
+        super().__init__()
+        self.pool = UnixConnectionPool(socket_path, maxsize=pool_size)
+    
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self.pool
+    
+    def get_connection(self, url, proxies=None):
+        return self.pool
+    
+    def request_url(self, request, proxies):
+        return request.path_url
+    
+    def close(self):
+        self.pool.close()
+
+def serve_in_process(socket_path: str, timeout: float = 30) -> "uvicorn.Server":
+    """Run this bridge on a Unix socket in a background thread of the current process"""
+    app.state.public = False
+    server = uvicorn.Server(uvicorn.Config(app, uds=socket_path, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="mcp-bridge", daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("In-process MCP bridge failed to start")
+        time.sleep(0.05)
+    logger.info(f"In-process MCP bridge listening on {socket_path}")
+    return server
+
+# The in-process bridge owns the global pool: one server per process, shared by every client
+in_process_lock = threading.Lock()
+in_process_target: Optional[str] = None
+
+def start_in_process() -> str:
+    """Start the in-process bridge on first use and return its unix:// address"""
+    global in_process_target
+    with in_process_lock:
+        if in_process_target is None:
+            command = mcp.bridges[0].command
+            if shutil.which(command) is None:
+                raise RuntimeError(f"MCP_BRIDGE_URL=inprocess needs the '{command}' command (requirements/bridge.txt), it is not installed here")
+            data_dir = os.path.dirname(mcp.bridges[0].data_dir) if mcp.size > 1 else mcp.bridges[0].data_dir
+            try:
+                os.makedirs(data_dir, exist_ok=True)
+            except OSError as e:
+                raise RuntimeError(f"MCP_BRIDGE_URL=inprocess cannot keep the graph in {data_dir}, set MCP_DATA_DIR: {e}") from e
+            socket_path = os.path.join(tempfile.mkdtemp(prefix="mcp-bridge-"), "bridge.sock")
+            serve_in_process(socket_path)
+            in_process_target = "unix://" + socket_path
+        return in_process_target
+
+def resolve_bridge(target: Optional[str] = None) -> str:
+    """MCP_BRIDGE_URL: http(s)://host:port, unix:///path/to.sock or inprocess (started here, on a private socket)"""
+    target = target or os.getenv("MCP_BRIDGE_URL", "http://mcp-bridge:8000")
+    if target == "inprocess":
+        target = start_in_process()
+    return target
+
+def connect_bridge(target: Optional[str] = None) -> "MCPClient":
+    """MCPClient for the configured bridge transport"""
+    target = resolve_bridge(target)
+    if target.startswith("unix://"):
+        client = MCPClient("http+unix://bridge")
+        client.session.mount("http+unix://", UnixAdapter(target[len("unix://"):]))
+        return client
+    return MCPClient(target)
+
+def connect_bridge_async(target: Optional[str] = None, **kwargs) -> "AsyncMCPClient":
+    """AsyncMCPClient for the configured bridge transport"""
+    target = resolve_bridge(target)
+    if target.startswith("unix://"):
+        return AsyncMCPClient("http://bridge", socket_path=target[len("unix://"):], **kwargs)
+    return AsyncMCPClient(target, **kwargs)
+
 # ==================== Client Class ====================
+# Operations that never change the graph, the only ones MCPClient may cache
+read_operations = ("read_graph", "search_nodes", "open_nodes")
+
+class ReadCache():
+    """Graph reads of one client: entries only count while their generation is current, every write bumps it"""
+    
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self.entries: Dict[str, tuple] = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+    
+    def key(self, method: str, endpoint: str, json_data: dict = None) -> str:
+        return json.dumps([method, endpoint, json_data], sort_keys=True)
+    
+    def lookup(self, key: str) -> tuple:
+        """(generation, cached answer or None), the generation goes back to store()"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == self.generation and entry[1] > time.monotonic():
+                return self.generation, entry[2]
+            return self.generation, None
+    
+    def store(self, key: str, generation: int, result):
+        with self.lock:
+            # A write that landed while reading makes this answer stale already
+            if generation == self.generation:
+                self.entries[key] = (generation, time.monotonic() + self.ttl, result)
+    
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+class BridgeOperations():
+    """Every bridge call as (kind, method, endpoint, payload, result key), shared by MCPClient and AsyncMCPClient
+    
+    'read' answers are cached, a 'write' clears the cache, a 'call' does neither.
+    """
+    
+    # ============ Entities ============
+    def create_entities(entities: list):
+        """Create entities in knowledge graph"""
+        return "write", "POST", "/entities", {"entities": entities}, None
+    def delete_entities(entity_names: list):
+        """Delete entities by name"""
+        return "write", "DELETE", "/entities", {"entityNames": entity_names}, None
+    # ============ Relations ============
+    def create_relations(relations: list):
+        """Create relations between entities"""
+        return "write", "POST", "/relations", {"relations": relations}, None
+    def delete_relations(relations: list):
+        """Delete relations"""
+        return "write", "DELETE", "/relations", {"relations": relations}, None
+    # ============ Observations ============
+    def add_observations(observations: list):
+        """Add observations/facts to entities"""
+        return "write", "POST", "/observations", {"observations": observations}, None
+    def delete_observations(deletions: list):
+        """Delete observations"""
+        return "write", "DELETE", "/observations", {"deletions": deletions}, None
+    # ============ Graph ============
+    def read_graph(cursor: Optional[str] = None, limit: Optional[int] = None, entity_type: Optional[str] = None, prefix: Optional[str] = None):
+        """Read the knowledge graph, one page of entities when a limit is given"""
+        params = {key: value for key, value in {"cursor": cursor, "limit": limit, "entity_type": entity_type, "prefix": prefix}.items() if value is not None}
+        return "read", "GET", "/graph", params or None, None
+    # ============ Nodes ============
+    def search_nodes(query: str):
+        """Search for nodes by query"""
+        return "read", "POST", "/nodes/search", {"query": query}, None
+    def open_nodes(names: list):
+        """Retrieve specific nodes by name"""
+        return "read", "POST", "/nodes/open", {"names": names}, None
+    # ============ Batch ============
+    def batch(operations: list, stop_on_error: bool = False):
+        """Run ordered operations ({"type": tool_name, **tool_args}) in one round trip"""
+        kind = "call" if all(operation.get("type") in read_operations for operation in operations) else "write"
+        return kind, "POST", "/batch", {"operations": operations, "stop_on_error": stop_on_error}, "results"
+    # ============ Utility ============
+    def status():
+        """Check server status"""
+        return "call", "GET", "/status", None, None
+    def reset():
+        """Reset knowledge graph"""
+        return "write", "POST", "/reset", None, None
+    def health():
+        """Health check"""
+        return "call", "GET", "/health", None, None
+    
+    names = ("create_entities", "delete_entities", "create_relations", "delete_relations", "add_observations", "delete_observations",
+             "read_graph", "search_nodes", "open_nodes", "batch", "status", "reset", "health")
+
+def graph_stream_params(entity_type: Optional[str] = None, prefix: Optional[str] = None) -> dict:
+    return {key: value for key, value in {"entity_type": entity_type, "prefix": prefix}.items() if value is not None}
+
 class MCPClient:
 
-    def __init__(self, bridge_url: str):
+    def __init__(self, bridge_url: str, cache_ttl: float = 60):
         self.bridge_url = bridge_url.rstrip("/")
         self.session = requests.Session()
         self.timeout = 30
+        self.cache = ReadCache(cache_ttl)
         self.session.headers.update({
             "ngrok-skip-browser-warning": "true",
             "User-Agent": "MCP-Client/1.0"
@@ -59,7 +273,7 @@ class MCPClient:
         url = f"{self.bridge_url}{endpoint}"
         try:
             if method == "GET":
-                response = self.session.get(url, timeout=self.timeout)
+                response = self.session.get(url, params=json_data, timeout=self.timeout)
             elif method == "POST":
                 response = self.session.post(url, json=json_data, timeout=self.timeout)
             elif method == "DELETE":
@@ -79,48 +293,132 @@ class MCPClient:
             logger.error(f"Request failed: {e}")
             raise
     
-    # ============ Entities ============
-    def create_entities(self, entities: list) -> dict:
-        """Create entities in knowledge graph"""
-        return self._request("POST", "/entities", {"entities": entities})
-    def delete_entities(self, entity_names: list) -> dict:
-        """Delete entities by name"""
-        return self._request("DELETE", "/entities", {"entityNames": entity_names})
-    # ============ Relations ============
-    def create_relations(self, relations: list) -> dict:
-        """Create relations between entities"""
-        return self._request("POST", "/relations", {"relations": relations})
-    def delete_relations(self, relations: list) -> dict:
-        """Delete relations"""
-        return self._request("DELETE", "/relations", {"relations": relations})
-    # ============ Observations ============
-    def add_observations(self, observations: list) -> dict:
-        """Add observations/facts to entities"""
-        return self._request("POST", "/observations", {"observations": observations})
-    def delete_observations(self, deletions: list) -> dict:
-        """Delete observations"""
-        return self._request("DELETE", "/observations", {"deletions": deletions})
-    # ============ Graph ============
-    def read_graph(self) -> dict:
-        """Read entire knowledge graph"""
-        return self._request("GET", "/graph")
-    # ============ Nodes ============
-    def search_nodes(self, query: str) -> dict:
-        """Search for nodes by query"""
-        return self._request("POST", "/nodes/search", {"query": query})
-    def open_nodes(self, names: list) -> dict:
-        """Retrieve specific nodes by name"""
-        return self._request("POST", "/nodes/open", {"names": names})
-    # ============ Utility ============
-    def status(self) -> dict:
-        """Check server status"""
-        return self._request("GET", "/status")
-    def reset(self) -> dict:
-        """Reset knowledge graph"""
-        return self._request("POST", "/reset")
-    def health(self) -> dict:
-        """Health check"""
-        return self._request("GET", "/health")
+    def _call(self, kind: str, method: str, endpoint: str, json_data: dict = None, result_key: Optional[str] = None):
+        """Send one BridgeOperations call through the cache"""
+        if kind == "read":
+            key = self.cache.key(method, endpoint, json_data)
+            generation, result = self.cache.lookup(key)
+            if result is None:
+                result = self._request(method, endpoint, json_data)
+                self.cache.store(key, generation, result)
+        else:
+            try:
+                result = self._request(method, endpoint, json_data)
+            finally:
+                if kind == "write":
+                    self.cache.invalidate()
+        return result[result_key] if result_key else result
+    
+    def invalidate(self):
+        self.cache.invalidate()
+    
+    def iter_graph(self, entity_type: Optional[str] = None, prefix: Optional[str] = None):
+        """Stream the knowledge graph, entities then relations, one item at a time"""
+        url = f"{self.bridge_url}/graph/stream"
+        with self.session.get(url, params=graph_stream_params(entity_type, prefix), timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+class AsyncMCPClient:
+    """MCPClient for event loops: pooled keep-alive connections, per-call timeouts, bounded concurrency"""
+    
+    def __init__(self, bridge_url: str, cache_ttl: float = 60, timeout: float = 30, max_concurrency: int = 16, socket_path: Optional[str] = None):
+        if httpx is None:
+            raise ImportError("AsyncMCPClient requires httpx")
+        self.bridge_url = bridge_url.rstrip("/")
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # HTTP/2 multiplexes calls over one connection when the h2 package is installed
+        http2 = socket_path is None and importlib.util.find_spec("h2") is not None
+        limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        transport = httpx.AsyncHTTPTransport(uds=socket_path, http2=http2, limits=limits) if socket_path else None
+        self.client = httpx.AsyncClient(
+            base_url=self.bridge_url,
+            timeout=timeout,
+            limits=limits,
+            http2=http2,
+            transport=transport,
+            headers={"ngrok-skip-browser-warning": "true", "User-Agent": "MCP-Client/1.0"},
+        )
+        self.cache = ReadCache(cache_ttl)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    async def aclose(self):
+        await self.client.aclose()
+    
+    async def _request(self, method: str, endpoint: str, json_data: dict = None, timeout: Optional[float] = None) -> dict:
+        url = f"{self.bridge_url}{endpoint}"
+        try:
+            async with self.semaphore:
+                if method == "GET":
+                    response = await self.client.get(endpoint, params=json_data, timeout=timeout or self.timeout)
+                elif method in ("POST", "DELETE"):
+                    response = await self.client.request(method, endpoint, json=json_data, timeout=timeout or self.timeout)
+                else:
+                    raise ValueError(f"Unsupported method: {method}")
+            response.raise_for_status()
+            return response.json()
+        except httpx.TimeoutException:
+            logger.error(f"Request to {url} timed out")
+            raise
+        except httpx.ConnectError:
+            logger.error(f"Failed to connect to {url}. Is the server running?")
+            raise
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+            raise
+    
+    async def _call(self, kind: str, method: str, endpoint: str, json_data: dict = None, result_key: Optional[str] = None, timeout: Optional[float] = None):
+        """Send one BridgeOperations call through the cache"""
+        if kind == "read":
+            key = self.cache.key(method, endpoint, json_data)
+            generation, result = self.cache.lookup(key)
+            if result is None:
+                result = await self._request(method, endpoint, json_data, timeout)
+                self.cache.store(key, generation, result)
+        else:
+            try:
+                result = await self._request(method, endpoint, json_data, timeout)
+            finally:
+                if kind == "write":
+                    self.cache.invalidate()
+        return result[result_key] if result_key else result
+    
+    def invalidate(self):
+        self.cache.invalidate()
+    
+    async def iter_graph(self, entity_type: Optional[str] = None, prefix: Optional[str] = None, timeout: Optional[float] = None):
+        """Stream the knowledge graph, entities then relations, one item at a time"""
+        async with self.semaphore:
+            async with self.client.stream("GET", "/graph/stream", params=graph_stream_params(entity_type, prefix), timeout=timeout or self.timeout) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield json.loads(line)
+
+def bind_operation(build):
+    @functools.wraps(build)
+    def operation(self, *args, **kwargs):
+        return self._call(*build(*args, **kwargs))
+    return operation
+
+def bind_async_operation(build):
+    @functools.wraps(build)
+    async def operation(self, *args, timeout: Optional[float] = None, **kwargs):
+        return await self._call(*build(*args, **kwargs), timeout=timeout)
+    return operation
+
+# Both clients expose the same operations, built from the one table
+for operation_name in BridgeOperations.names:
+    setattr(MCPClient, operation_name, bind_operation(getattr(BridgeOperations, operation_name)))
+    setattr(AsyncMCPClient, operation_name, bind_async_operation(getattr(BridgeOperations, operation_name)))
 
 # Enable CORS for external clients
 app.add_middleware(
@@ -143,61 +441,216 @@ async def add_ngrok_headers(request: Request, call_next):
 class MCPStdioBridge:
     """Manages connection to MCP server via stdio (subprocess)"""
     
-    def __init__(self, command: str = "mcp-memory", data_dir: str = "/bridge/data"):
+    def __init__(self, command: str = "mcp-memory", data_dir: str = "/bridge/data", timeout: float = 30, restart_wait: float = 5):
         self.command = command
         self.data_dir = data_dir
+        self.timeout = timeout
+        # How long a request waits for a restarting server before failing
+        self.restart_wait = restart_wait
         self.process = None
         self.lock = asyncio.Lock()
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.commands: Dict[int, dict] = {}
+        # Ids in write order, answered or not: a reply without id belongs to the oldest one
+        self.order: deque = deque()
+        self.next_id = 0
+        self.reader_task = None
+        self.stderr_task = None
+        self.recover_task = None
+        self.ready = asyncio.Event()
+        self.stopping = False
+        self.started_at = 0.0
+        self.crash_streak = 0
+        self.restarts = 0
     
     async def start(self):
         """Start the MCP server subprocess"""
+        self.stopping = False
         try:
-            # Create data directory if it doesn't exist
-            os.makedirs(self.data_dir, exist_ok=True)
-            
-            # Set up environment with data directory
-            env = os.environ.copy()
-            env["MCP_DATA_DIR"] = self.data_dir
-            env["DATA_DIR"] = self.data_dir
-            
-            # Start the MCP server
-            self.process = await asyncio.create_subprocess_exec(
-                self.command,
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env,
-            )
-            logger.info(f"MCP server started (PID: {self.process.pid})")
-            logger.info(f"Data directory: {self.data_dir}")
+            await self._spawn()
         except Exception as e:
             logger.error(f"Failed to start MCP server: {e}")
             raise
     
-    async def send(self, command: dict) -> dict:
-        """Send JSON command to MCP via stdin and read response from stdout"""
-        if not self.process or self.process.returncode is not None:
+    async def _spawn(self):
+        # Create data directory if it doesn't exist
+        os.makedirs(self.data_dir, exist_ok=True)
+        
+        # Set up environment with data directory
+        env = os.environ.copy()
+        env["MCP_DATA_DIR"] = self.data_dir
+        env["DATA_DIR"] = self.data_dir
+        
+        # Start the MCP server (read_graph answers on a single line, longer lines are read in pieces)
+        self.process = await asyncio.create_subprocess_exec(
+            self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            limit=2 ** 24,
+        )
+        self.started_at = time.monotonic()
+        self.order.clear()
+        self.reader_task = asyncio.create_task(self._read_responses(self.process))
+        self.stderr_task = asyncio.create_task(self._drain_stderr(self.process))
+        self.ready.set()
+        logger.info(f"MCP server started (PID: {self.process.pid})")
+        logger.info(f"Data directory: {self.data_dir}")
+    
+    async def send(self, command: dict, timeout: Optional[float] = None) -> dict:
+        """Send JSON command to MCP via stdin and wait for the response carrying its id"""
+        timeout = timeout or self.timeout
+        if not self.ready.is_set() and not self.stopping:
+            # Restarting: wait a little rather than failing a request the new process can take
+            try:
+                await asyncio.wait_for(self.ready.wait(), min(timeout, self.restart_wait))
+            except asyncio.TimeoutError:
+                pass
+        if self.stopping or not self.ready.is_set() or not self.process or self.process.returncode is not None:
             raise RuntimeError("MCP process is not running")
         
-        async with self.lock:
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.commands[request_id] = command
+        try:
+            # Only the write is serialised, responses are dispatched by the reader task
             try:
-                # Send command as JSON line
-                json_line = json.dumps(command) + "\n"
-                self.process.stdin.write(json_line.encode())
-                await self.process.stdin.drain()
-                
-                # Read response line
-                response_line = await self.process.stdout.readline()
+                await self._write(request_id)
+            except (BrokenPipeError, ConnectionResetError):
+                # Reads are replayed once the server is back, writes fail right away
+                if command.get("type") not in read_operations:
+                    raise RuntimeError("MCP process exited before the request was sent")
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"MCP request {request_id} ({command.get('type')}) timed out")
+            raise RuntimeError(f"MCP request {request_id} timed out")
+        except Exception as e:
+            logger.error(f"Error communicating with MCP: {e}")
+            raise
+        finally:
+            self.pending.pop(request_id, None)
+            self.commands.pop(request_id, None)
+    
+    async def _write(self, request_id: int):
+        json_line = json.dumps({**self.commands[request_id], "id": request_id}) + "\n"
+        async with self.lock:
+            self.process.stdin.write(json_line.encode())
+            self.order.append(request_id)
+            await self.process.stdin.drain()
+    
+    async def _read_responses(self, process):
+        """Single reader: route every response line to the future waiting for its id"""
+        try:
+            while True:
+                response_line = await self._readline(process.stdout)
                 if not response_line:
-                    raise RuntimeError("No response from MCP server")
-                
-                return json.loads(response_line.decode())
+                    break
+                try:
+                    response = json.loads(response_line.decode())
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring non-JSON line from MCP: {response_line[:200]!r}")
+                    continue
+                if isinstance(response, dict) and "id" in response:
+                    request_id = response.pop("id")
+                    try:
+                        self.order.remove(request_id)
+                    except ValueError:
+                        pass
+                    future = self.pending.pop(request_id, None)
+                elif self.order:
+                    # Backend replied without an id: it answers in order, so it is the oldest request written.
+                    # A request that timed out keeps its place, its late reply is dropped instead of shifting the rest
+                    request_id = self.order.popleft()
+                    future = self.pending.pop(request_id, None)
+                    if future is None:
+                        logger.warning(f"Dropping late MCP reply to timed-out request {request_id}")
+                else:
+                    future = None
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except Exception as e:
+            logger.error(f"MCP reader stopped: {e}")
+        finally:
+            self.ready.clear()
+            # Nobody reads the backend any more: stop it so _recover can restart it instead of waiting forever
+            if process.returncode is None and not self.stopping:
+                logger.warning(f"Killing MCP server {process.pid}, its output is no longer read")
+                process.kill()
+            # A write may or may not have been applied: fail it; a read is safe to send again
+            replay = []
+            for request_id, future in list(self.pending.items()):
+                if future.done():
+                    continue
+                if not self.stopping and self.commands.get(request_id, {}).get("type") in read_operations:
+                    replay.append(request_id)
+                else:
+                    future.set_exception(RuntimeError("No response from MCP server"))
+                    self.pending.pop(request_id, None)
+            if not self.stopping:
+                self.recover_task = asyncio.create_task(self._recover(process, replay))
+    
+    async def _readline(self, stream) -> bytes:
+        """readline without a length limit, a line longer than the stream buffer is read in pieces"""
+        chunks = []
+        while True:
+            try:
+                chunks.append(await stream.readuntil(b"\n"))
+                return b"".join(chunks)
+            except asyncio.LimitOverrunError as e:
+                chunks.append(await stream.readexactly(e.consumed))
+            except asyncio.IncompleteReadError as e:
+                chunks.append(e.partial)
+                return b"".join(chunks)
+    
+    async def _recover(self, process, replay: List[int]):
+        """Restart a crashed server, backing off while it keeps crashing, then replay pending reads"""
+        await process.wait()
+        logger.warning(f"MCP server exited with code {process.returncode}, restarting")
+        # A server that dies right after starting is not restarted in a tight loop
+        self.crash_streak = self.crash_streak + 1 if time.monotonic() - self.started_at < 5 else 0
+        attempt = 0
+        while not self.stopping:
+            delay = min(0.1 * 2 ** (self.crash_streak + attempt), 5) if self.crash_streak or attempt else 0
+            await asyncio.sleep(delay)
+            try:
+                await self._spawn()
+                break
             except Exception as e:
-                logger.error(f"Error communicating with MCP: {e}")
-                raise
+                logger.error(f"Failed to restart MCP server: {e}")
+                attempt += 1
+                for request_id in replay:
+                    future = self.pending.pop(request_id, None)
+                    if future is not None and not future.done():
+                        future.set_exception(RuntimeError("MCP server is restarting"))
+                replay = []
+        if self.stopping:
+            return
+        self.restarts += 1
+        for request_id in replay:
+            future = self.pending.get(request_id)
+            if future is not None and not future.done():
+                try:
+                    await self._write(request_id)
+                except Exception as e:
+                    future.set_exception(RuntimeError(f"Replay failed: {e}"))
+        if replay:
+            logger.info(f"Replayed {len(replay)} pending reads on the restarted MCP server")
+    
+    async def _drain_stderr(self, process):
+        """Log backend stderr so a full pipe never blocks the subprocess"""
+        while True:
+            line = await process.stderr.readline()
+            if not line:
+                break
+            logger.info(f"[mcp-memory] {line.decode(errors='replace').rstrip()}")
     
     async def stop(self):
         """Stop the MCP server subprocess"""
+        self.stopping = True
+        self.ready.clear()
         if self.process and self.process.returncode is None:
             self.process.terminate()
             try:
@@ -207,24 +660,353 @@ class MCPStdioBridge:
                 self.process.kill()
                 await self.process.wait()
                 logger.info("MCP server killed")
+        for task in (self.reader_task, self.stderr_task, self.recover_task):
+            if task:
+                task.cancel()
+
+class GraphIndex:
+    """Inverted index of entity names, types and observation tokens for search_nodes"""
+    
+    def __init__(self):
+        self.entities: Dict[str, dict] = {}
+        self.relations: Dict[str, list] = {}
+        self.postings: Dict[str, set] = {}
+        self.tokens: Dict[str, set] = {}
+        # Every 1 to 3 character substring of the vocabulary, with the tokens holding it
+        self.grams: Dict[str, set] = {}
+        self.ready = False
+    
+    def load(self, graph: dict):
+        """Index a full read_graph answer"""
+        self.clear()
+        self.add(graph)
+        self.ready = True
+    
+    def clear(self):
+        self.entities, self.relations, self.postings, self.tokens, self.grams = {}, {}, {}, {}, {}
+        self.ready = False
+    
+    def add(self, graph: dict):
+        """Index one read_graph answer, a shard's part of the graph"""
+        for entity in graph.get("entities", []):
+            self._put_entity(entity)
+        for relation in graph.get("relations", []):
+            self.relations.setdefault(relation.get("from"), []).append(relation)
+    
+    def apply(self, command: dict):
+        """Mirror a successful write, with mcp-memory's rules (existing names and facts are ignored)"""
+        command_type = command.get("type")
+        if command_type == "create_entities":
+            for entity in command.get("entities", []):
+                if entity.get("name") not in self.entities:
+                    self._put_entity(entity)
+        elif command_type == "delete_entities":
+            names = set(command.get("entityNames", []))
+            for name in names:
+                self._drop_entity(name)
+            for source in list(self.relations):
+                kept = [relation for relation in self.relations[source] if source not in names and relation.get("to") not in names]
+                if kept:
+                    self.relations[source] = kept
+                else:
+                    del self.relations[source]
+        elif command_type == "create_relations":
+            for relation in command.get("relations", []):
+                existing = self.relations.setdefault(relation.get("from"), [])
+                if relation not in existing:
+                    existing.append(relation)
+        elif command_type == "delete_relations":
+            for relation in command.get("relations", []):
+                existing = self.relations.get(relation.get("from"), [])
+                if relation in existing:
+                    existing.remove(relation)
+        elif command_type == "add_observations":
+            for item in command.get("observations", []):
+                entity = self.entities.get(item.get("entityName"))
+                if entity is not None:
+                    contents = [content for content in item.get("contents", []) if content not in entity["observations"]]
+                    self._put_entity({**entity, "observations": entity["observations"] + contents})
+        elif command_type == "delete_observations":
+            for item in command.get("deletions", []):
+                entity = self.entities.get(item.get("entityName"))
+                if entity is not None:
+                    removed = set(item.get("observations", []))
+                    self._put_entity({**entity, "observations": [observation for observation in entity["observations"] if observation not in removed]})
+        elif command_type == "reset":
+            self.load({})
+    
+    def search(self, query: str) -> dict:
+        """Entities whose name, type or an observation contains the query, and the relations between them
+        
+        Every word of the query lies inside a word of a matching entity ('maha' inside 'yamaha'),
+        so candidates are the entities holding a token that contains each word.
+        """
+        needle = str(query).lower().strip()
+        candidates = None
+        for term in self._tokenize(needle):
+            matched = set()
+            for token in self._containing(term):
+                matched |= self.postings[token]
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                break
+        if candidates is None:
+            candidates = set(self.entities)
+        entities = [self.entities[name] for name in sorted(candidates) if self._contains(self.entities[name], needle)]
+        names = {entity["name"] for entity in entities}
+        relations = [relation for name in sorted(names) for relation in self.relations.get(name, []) if relation.get("to") in names]
+        return {"entities": entities, "relations": relations}
+    
+    def _containing(self, term: str) -> set:
+        """Tokens that contain the term, from the n-gram postings"""
+        if len(term) <= 3:
+            return self.grams.get(term, set())
+        # Tokens holding every trigram of the term, then checked for the whole term
+        trigrams = sorted((self.grams.get(term[i:i + 3], set()) for i in range(len(term) - 2)), key=len)
+        return {token for token in trigrams[0].intersection(*trigrams[1:]) if term in token}
+    
+    def _grams(self, token: str) -> set:
+        return {token[i:i + n] for n in (1, 2, 3) for i in range(len(token) - n + 1)}
+    
+    def _contains(self, entity: dict, needle: str) -> bool:
+        if needle in str(entity.get("name", "")).lower() or needle in str(entity.get("entityType", "")).lower():
+            return True
+        return any(needle in str(observation).lower() for observation in entity["observations"])
+    
+    def _put_entity(self, entity: dict):
+        name = entity.get("name")
+        self._drop_entity(name)
+        entity = {"name": name, "entityType": entity.get("entityType"), "observations": list(entity.get("observations") or [])}
+        tokens = set(self._tokenize(" ".join([str(name), str(entity["entityType"]), *map(str, entity["observations"])])))
+        for token in tokens:
+            if token not in self.postings:
+                self.postings[token] = set()
+                for gram in self._grams(token):
+                    self.grams.setdefault(gram, set()).add(token)
+            self.postings[token].add(name)
+        self.entities[name] = entity
+        self.tokens[name] = tokens
+    
+    def _drop_entity(self, name: str):
+        self.entities.pop(name, None)
+        for token in self.tokens.pop(name, ()):
+            self.postings[token].discard(name)
+            if not self.postings[token]:
+                del self.postings[token]
+                for gram in self._grams(token):
+                    self.grams[gram].discard(token)
+                    if not self.grams[gram]:
+                        del self.grams[gram]
+    
+    def _tokenize(self, text: str) -> List[str]:
+        return re.findall(r"\w+", text.lower())
 
-# Initialize bridge with data directory
-mcp = MCPStdioBridge(command="mcp-memory", data_dir="/bridge/data")
+class MCPBridgePool:
+    """Shards the knowledge graph over several mcp-memory subprocesses"""
+    
+    # Key holding the entity name in each item of a routed list
+    routed_lists = {
+        "create_entities": ("entities", "name"),
+        "create_relations": ("relations", "from"),
+        "delete_relations": ("relations", "from"),
+        "add_observations": ("observations", "entityName"),
+        "delete_observations": ("deletions", "entityName"),
+        "open_nodes": ("names", None),
+    }
+    
+    def __init__(self, command: str = "mcp-memory", data_dir: str = "/bridge/data", size: int = 1, replicas: int = 64, search_index: bool = True):
+        # Changing the size moves entities to other shards: keep it fixed for a given data directory
+        self.size = max(1, size)
+        if self.size == 1:
+            self.bridges = [MCPStdioBridge(command=command, data_dir=data_dir)]
+        else:
+            self.bridges = [MCPStdioBridge(command=command, data_dir=os.path.join(data_dir, f"shard-{i}")) for i in range(self.size)]
+        self.ring = sorted((self._hash(f"shard-{i}#{r}"), i) for i in range(self.size) for r in range(replicas))
+        self.ring_keys = [key for key, _ in self.ring]
+        self.index_task = None
+        # Entity names in order for paginated reads, rebuilt after any write
+        self.generation = 0
+        self.snapshot = None
+        self.snapshot_lock = asyncio.Lock()
+        self.index = GraphIndex() if search_index else None
+    
+    async def start(self):
+        """Start every shard, each one restarts its own subprocess when it dies"""
+        await asyncio.gather(*(bridge.start() for bridge in self.bridges))
+        # Searches go to the backend while the index builds
+        if self.index is not None:
+            self.index_task = asyncio.create_task(self.build_index())
+        logger.info(f"MCP pool started with {self.size} shard(s)")
+    
+    async def stop(self):
+        """Stop the index build, then every shard"""
+        if self.index_task:
+            self.index_task.cancel()
+        await asyncio.gather(*(bridge.stop() for bridge in self.bridges))
+    
+    def running(self) -> List[bool]:
+        return [bool(bridge.ready.is_set() and bridge.process and bridge.process.returncode is None) for bridge in self.bridges]
+    
+    def restarts(self) -> List[int]:
+        return [bridge.restarts for bridge in self.bridges]
+    
+    def shard_for(self, name: str) -> int:
+        """Consistent hashing of an entity name onto the ring"""
+        index = bisect.bisect(self.ring_keys, self._hash(str(name))) % len(self.ring)
+        return self.ring[index][1]
+    
+    async def dispatch(self, command: dict) -> dict:
+        """Route entity operations by name, fan graph-wide ones out and merge the answers"""
+        if command.get("type") == "search_nodes" and self.index is not None and self.index.ready:
+            return self.index.search(command.get("query", ""))
+        if command.get("type") in read_operations:
+            return await self._route(command)
+        try:
+            result = await self._route(command)
+        except Exception:
+            # The backend may have applied part of the write, read it back later
+            if self.index is not None and self.index.ready:
+                self.rebuild_index()
+            raise
+        finally:
+            self.generation += 1
+        if self.index is not None and self.index.ready:
+            if isinstance(result, dict) and "error" in result:
+                self.rebuild_index()
+            else:
+                self.index.apply(command)
+        return result
+    
+    def rebuild_index(self):
+        """Stop answering from the index and build it again, a build in progress restarts by itself"""
+        self.index.ready = False
+        if self.index_task is None or self.index_task.done():
+            self.index_task = asyncio.create_task(self.build_index())
+    
+    async def build_index(self):
+        """Index the whole graph, searches go to the backend until this succeeds"""
+        try:
+            while True:
+                generation = self.generation
+                self.index.clear()
+                # One shard at a time: only a shard's answer is held next to the index, never a merged copy
+                for bridge in self.bridges:
+                    graph = await bridge.send({"type": "read_graph"})
+                    # Indexing takes seconds on a large graph, keep it off the event loop (nothing reads the index until it is ready)
+                    await asyncio.to_thread(self.index.add, graph if isinstance(graph, dict) else {})
+                    del graph
+                # Writes made during the reads are not in the index, read again
+                if generation == self.generation:
+                    break
+                logger.info("Graph changed while indexing, rebuilding the search index")
+            self.index.ready = True
+            logger.info(f"Search index built: {len(self.index.entities)} entities, {len(self.index.postings)} tokens")
+        except Exception as e:
+            self.index.clear()
+            logger.error(f"Failed to build search index, forwarding searches: {e}")
+    
+    async def graph_snapshot(self) -> dict:
+        """Entity names in order with entities by name and relations by source, cached until the next write
+        
+        mcp-memory cannot page read_graph: pages are cut from one in-memory copy of the graph,
+        the search index itself when it is ready, else the shards read one at a time.
+        """
+        async with self.snapshot_lock:
+            if self.snapshot is None or self.snapshot["generation"] != self.generation:
+                generation = self.generation
+                if self.index is not None and self.index.ready:
+                    entities, relations = self.index.entities, self.index.relations
+                else:
+                    entities, relations = {}, {}
+                    for bridge in self.bridges:
+                        graph = await bridge.send({"type": "read_graph"})
+                        for entity in graph.get("entities", []):
+                            entities[str(entity.get("name", ""))] = entity
+                        for relation in graph.get("relations", []):
+                            relations.setdefault(relation.get("from"), []).append(relation)
+                        del graph
+                self.snapshot = {
+                    "generation": generation,
+                    "names": sorted(entities),
+                    "entities": entities,
+                    "relations": relations,
+                }
+            return self.snapshot
+    
+    async def _route(self, command: dict) -> dict:
+        if self.size == 1:
+            return await self.bridges[0].send(command)
+        command_type = command.get("type")
+        if command_type in self.routed_lists:
+            field, key = self.routed_lists[command_type]
+            groups: Dict[int, list] = {}
+            for item in command.get(field) or []:
+                name = item if key is None else item.get(key)
+                groups.setdefault(self.shard_for(name), []).append(item)
+            results = await asyncio.gather(*(self.bridges[shard].send({**command, field: items}) for shard, items in groups.items()))
+        elif command_type in ("read_graph", "search_nodes", "reset", "delete_entities"):
+            # Relations live on the shard of their source: deleting an entity also clears the ones pointing to it elsewhere
+            results = await asyncio.gather(*(bridge.send(command) for bridge in self.bridges))
+        else:
+            results = [await self.bridges[0].send(command)]
+        return self._merge(list(results))
+    
+    def _merge(self, results: list):
+        if len(results) == 1:
+            return results[0]
+        if all(isinstance(result, list) for result in results):
+            return [item for result in results for item in result]
+        if all(isinstance(result, dict) for result in results):
+            merged = {}
+            for result in results:
+                for key, value in result.items():
+                    if isinstance(value, list):
+                        merged.setdefault(key, []).extend(value)
+                    else:
+                        merged.setdefault(key, value)
+            return merged
+        return results
+    
+    def _hash(self, value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+def pool_size() -> int:
+    """MCP_SHARDS: number of mcp-memory processes, 'auto' for one per CPU core"""
+    value = os.getenv("MCP_SHARDS", "1")
+    if value == "auto":
+        return os.cpu_count() or 1
+    return int(value)
+
+# Initialize bridge pool with data directory
+# MCP_DATA_DIR: where mcp-memory keeps the graph, a volume in docker ('/bridge/data' in the bridge image)
+mcp = MCPBridgePool(command="mcp-memory", data_dir=os.getenv("MCP_DATA_DIR", "/bridge/data"), size=pool_size(), search_index=os.getenv("MCP_SEARCH_INDEX", "1") != "0")
 
 # ==================== Startup/Shutdown ====================
 @app.on_event("startup")
 async def startup_event():
-    """Start MCP server on app startup"""
+    """Start MCP server on app startup, ngrok discovery runs in the background"""
+    app.state.public_url = None
     await mcp.start()
     
-    # Get ngrok URL for external LLM clients
-    ngrok_url = get_ngrok_url()
+    # An in-process bridge is never exposed
+    if not getattr(app.state, "public", True) or not ngrok_enabled():
+        return
+    app.state.ngrok_task = asyncio.create_task(discover_ngrok())
+
+async def discover_ngrok():
+    """Get ngrok URL for external LLM clients without blocking the event loop"""
+    ngrok_url = await asyncio.to_thread(get_ngrok_url)
+    app.state.public_url = ngrok_url
     if ngrok_url:
         logger.info(f"Bridge accessible at: {ngrok_url}")
         logger.info(f"External LLM clients should use: {ngrok_url}")
     else:
         logger.warning("Could not retrieve ngrok URL. Make sure ngrok is running.")
 
+def ngrok_enabled() -> bool:
+    """MCP_NGROK: look for a tunnel, on by default when an ngrok token is configured"""
+    return os.getenv("MCP_NGROK", "1" if os.getenv("NGROK_AUTH_TOKEN") else "0") != "0"
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Stop MCP server on app shutdown"""
@@ -240,7 +1022,7 @@ async def create_entities(request: Request):
         raise HTTPException(status_code=400, detail="Missing 'entities' field")
     
     payload = {"type": "create_entities", "entities": entities}
-    result = await mcp.send(payload)
+    result = await mcp.dispatch(payload)
     return result
 
 @app.delete("/entities")
@@ -252,7 +1034,7 @@ async def delete_entities(request: Request):
         raise HTTPException(status_code=400, detail="Missing 'entityNames' field")
     
     payload = {"type": "delete_entities", "entityNames": entity_names}
-    result = await mcp.send(payload)
+    result = await mcp.dispatch(payload)
     return result
 
 # ==================== Relations ====================
@@ -265,7 +1047,7 @@ async def create_relations(request: Request):
         raise HTTPException(status_code=400, detail="Missing 'relations' field")
     
     payload = {"type": "create_relations", "relations": relations}
-    result = await mcp.send(payload)
+    result = await mcp.dispatch(payload)
     return result
 
 @app.delete("/relations")
@@ -277,7 +1059,7 @@ async def delete_relations(request: Request):
         raise HTTPException(status_code=400, detail="Missing 'relations' field")
     
     payload = {"type": "delete_relations", "relations": relations}
-    result = await mcp.send(payload)
+    result = await mcp.dispatch(payload)
     return result
 
 # ==================== Observations ====================
@@ -290,7 +1072,7 @@ async def add_observations(request: Request):
         raise HTTPException(status_code=400, detail="Missing 'observations' field")
     
     payload = {"type": "add_observations", "observations": observations}
-    result = await mcp.send(payload)
+    result = await mcp.dispatch(payload)
     return result
 
 @app.delete("/observations")
@@ -302,16 +1084,68 @@ async def delete_observations(request: Request):
         raise HTTPException(status_code=400, detail="Missing 'deletions' field")
     
     payload = {"type": "delete_observations", "deletions": deletions}
-    result = await mcp.send(payload)
+    result = await mcp.dispatch(payload)
     return result
 
 # ==================== Graph ====================
+def select_entities(snapshot: dict, cursor: Optional[str] = None, entity_type: Optional[str] = None, prefix: Optional[str] = None):
+    """Entities after the cursor (a name, exclusive) matching the filters, in name order"""
+    start = bisect.bisect_right(snapshot["names"], cursor) if cursor is not None else 0
+    if prefix is not None:
+        start = max(start, bisect.bisect_left(snapshot["names"], prefix))
+    for position in range(start, len(snapshot["names"])):
+        # The index may drop an entity while a stream is being sent
+        entity = snapshot["entities"].get(snapshot["names"][position])
+        if entity is None:
+            continue
+        if entity_type is not None and entity.get("entityType") != entity_type:
+            continue
+        if prefix is not None and not str(entity.get("name", "")).startswith(prefix):
+            # Names are sorted, nothing further can match the prefix
+            if str(entity.get("name", "")) > prefix:
+                break
+            continue
+        yield entity
+
 @app.get("/graph")
-async def read_graph():
-    """Read entire knowledge graph"""
-    payload = {"type": "read_graph"}
-    result = await mcp.send(payload)
-    return result
+async def read_graph(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    entity_type: Optional[str] = None,
+    prefix: Optional[str] = None,
+):
+    """Read the knowledge graph, paginated by entity name when a limit is given"""
+    if cursor is None and limit is None and entity_type is None and prefix is None:
+        payload = {"type": "read_graph"}
+        result = await mcp.dispatch(payload)
+        return result
+    
+    snapshot = await mcp.graph_snapshot()
+    entities = []
+    next_cursor = None
+    for entity in select_entities(snapshot, cursor, entity_type, prefix):
+        if limit is not None and len(entities) == limit:
+            next_cursor = entities[-1]["name"]
+            break
+        entities.append(entity)
+    relations = [relation for entity in entities for relation in snapshot["relations"].get(entity.get("name"), [])]
+    return {"entities": entities, "relations": relations, "next_cursor": next_cursor}
+
+@app.get("/graph/stream")
+async def stream_graph(entity_type: Optional[str] = None, prefix: Optional[str] = None):
+    """Stream the knowledge graph as NDJSON, entities first, then their relations"""
+    snapshot = await mcp.graph_snapshot()
+    
+    def lines():
+        names = []
+        for entity in select_entities(snapshot, None, entity_type, prefix):
+            names.append(entity.get("name"))
+            yield json.dumps({"type": "entity", **entity}, ensure_ascii=False) + "\n"
+        for name in names:
+            for relation in snapshot["relations"].get(name, []):
+                yield json.dumps({"type": "relation", **relation}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 # ==================== Nodes ====================
 @app.post("/nodes/search")
@@ -323,7 +1157,7 @@ async def search_nodes(request: Request):
         raise HTTPException(status_code=400, detail="Missing 'query' field")
     
     payload = {"type": "search_nodes", "query": query}
-    result = await mcp.send(payload)
+    result = await mcp.dispatch(payload)
     return result
 
 @app.post("/nodes/open")
@@ -335,22 +1169,99 @@ async def open_nodes(request: Request):
         raise HTTPException(status_code=400, detail="Missing 'names' field")
     
     payload = {"type": "open_nodes", "names": names}
-    result = await mcp.send(payload)
+    result = await mcp.dispatch(payload)
     return result
 
+# ==================== Batch ====================
+# Required field of every operation accepted by /batch
+batch_fields = {
+    "create_entities": "entities",
+    "delete_entities": "entityNames",
+    "create_relations": "relations",
+    "delete_relations": "relations",
+    "add_observations": "observations",
+    "delete_observations": "deletions",
+    "search_nodes": "query",
+    "open_nodes": "names",
+    "read_graph": None,
+}
+
+def batch_error(operation) -> Optional[str]:
+    """Why an operation cannot run, None when it is well formed"""
+    if not isinstance(operation, dict):
+        return "Operation must be an object"
+    operation_type = operation.get("type")
+    if operation_type not in batch_fields:
+        return f"Unsupported operation '{operation_type}'"
+    field = batch_fields[operation_type]
+    if field is None:
+        return None
+    value = operation.get(field)
+    if field == "query":
+        return None if isinstance(value, str) and value else f"Missing '{field}' field"
+    return None if isinstance(value, list) and value else f"Missing '{field}' field"
+
+async def run_batch_operation(index: int, operation) -> dict:
+    error = batch_error(operation)
+    if error:
+        return {"index": index, "ok": False, "error": error}
+    payload = {"type": operation["type"]}
+    field = batch_fields[operation["type"]]
+    if field:
+        payload[field] = operation[field]
+    try:
+        return {"index": index, "ok": True, "result": await mcp.dispatch(payload)}
+    except Exception as e:
+        return {"index": index, "ok": False, "error": str(e)}
+
+@app.post("/batch")
+async def batch(request: Request):
+    """Run an ordered list of operations, one result or error per operation"""
+    data = await request.json()
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        raise HTTPException(status_code=400, detail="Missing 'operations' field")
+    stop_on_error = bool(data.get("stop_on_error", False))
+    
+    def is_read(operation) -> bool:
+        return batch_error(operation) is None and operation["type"] in read_operations
+    
+    results = []
+    position = 0
+    while position < len(operations):
+        # Consecutive reads do not depend on each other and run together, writes keep their order
+        end = position + 1
+        if is_read(operations[position]):
+            while end < len(operations) and is_read(operations[end]):
+                end += 1
+        for result in await asyncio.gather(*(run_batch_operation(index, operations[index]) for index in range(position, end))):
+            results.append(result)
+            if stop_on_error and not result["ok"]:
+                return {"results": results}
+        position = end
+    return {"results": results}
+
 # ==================== Utility ====================
 @app.get("/status")
 async def status():
     """Check server status"""
-    if mcp.process and mcp.process.returncode is None:
-        return {"status": "running", "mcp_mode": "stdio"}
-    return {"status": "mcp_not_running", "mcp_mode": "stdio"}
+    running = mcp.running()
+    state = {
+        "mcp_mode": "stdio",
+        "shards": len(running),
+        "restarts": mcp.restarts(),
+        "search_index": bool(mcp.index and mcp.index.ready),
+        "public_url": getattr(app.state, "public_url", None),
+    }
+    if all(running):
+        return {"status": "running", **state}
+    return {"status": "mcp_not_running", "running": running, **state}
 
 @app.post("/reset")
 async def reset():
     """Reset the knowledge graph"""
     payload = {"type": "reset"}
-    result = await mcp.send(payload)
+    result = await mcp.dispatch(payload)
     return result
 
 @app.get("/health")
@@ -553,5 +1464,17 @@ tools = [
 ]
 
 # ==================== Run ====================
+async def serve(socket_path: Optional[str] = None, port: int = 8000):
+    """Serve on the TCP port, and on a Unix socket as well when one is given (same app, same pool)"""
+    servers = [uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=port))]
+    if socket_path:
+        os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        # The TCP server runs startup and shutdown, the pool must start once
+        servers.append(uvicorn.Server(uvicorn.Config(app, uds=socket_path, lifespan="off")))
+        logger.info(f"Bridge also listening on unix://{socket_path}")
+    await asyncio.gather(*(server.serve() for server in servers))
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    asyncio.run(serve(os.getenv("MCP_BRIDGE_SOCKET"), int(os.getenv("MCP_BRIDGE_PORT", "8000"))))
@@ -0,0 +1,109 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os, json, time, asyncio, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+class LinkChecker():
+
+    def __init__(self, cache_file: str, per_host: int = 4, max_connections: int = 64, timeout: float = 8, alive_ttl: float = 7 * 86400, dead_ttl: float = 86400, seed_file: Optional[str] = None):
+        self.cache_file = cache_file
+        self.seed_file = seed_file
+        self.per_host = per_host
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.alive_ttl = alive_ttl
+        self.dead_ttl = dead_ttl
+        self.lock = threading.Lock()
+        self.cache = self._load_cache()
+
+    def check_many(self, urls: List[Optional[str]]) -> List[bool]:
+        """Liveness of every URL, in order; cached answers are reused until they expire"""
+        now = time.time()
+        unknown = []
+        with self.lock:
+            for url in urls:
+                entry = self.cache.get(url) if url else None
+                if url and (entry is None or entry["expires"] < now) and url not in unknown:
+                    unknown.append(url)
+        results: Dict[str, Optional[bool]] = {}
+        if unknown:
+            results = self._run(self._check_all(unknown))
+            with self.lock:
+                for url, alive in results.items():
+                    # Only an answer from the host is remembered, a network failure says nothing about the link
+                    if alive is not None:
+                        self.cache[url] = {"alive": alive, "expires": now + (self.alive_ttl if alive else self.dead_ttl)}
+            self._save_cache()
+            unreachable = sum(alive is None for alive in results.values())
+            logging.info(f"🔗 Checked {len(unknown)} links, {sum(alive is True for alive in results.values())} alive, {unreachable} unreachable")
+        with self.lock:
+            # Unreachable links get the benefit of the doubt rather than a paid new search
+            return [bool(url) and (results[url] is not False if url in results else self.cache[url]["alive"]) for url in urls]
+
+    def _run(self, coroutine):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # Called from inside an event loop: run on a private loop in a worker thread
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, coroutine).result()
+
+    async def _check_all(self, urls: List[str]) -> Dict[str, Optional[bool]]:
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        hosts: Dict[str, asyncio.Semaphore] = {}
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=True, headers={"User-Agent": "Mulster-Autologue/1.0"}) as client:
+            async def check(url: str) -> bool:
+                host = urlparse(url).netloc.lower()
+                semaphore = hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+                async with semaphore:
+                    return await self._check(client, url)
+            results = await asyncio.gather(*(check(url) for url in urls))
+        return dict(zip(urls, results))
+
+    async def _check(self, client: httpx.AsyncClient, url: str) -> Optional[bool]:
+        """True when the link answers, False on a client error (4xx), None when the host could not tell"""
+        try:
+            response = await client.head(url)
+            if response.status_code < 400:
+                return True
+            # Many servers refuse HEAD, ask for a single byte instead
+            if response.status_code in (403, 405, 501) or response.status_code >= 500:
+                async with client.stream("GET", url, headers={"Range": "bytes=0-0"}) as response:
+                    status_code = response.status_code
+            else:
+                status_code = response.status_code
+            if status_code < 400:
+                return True
+            return False if status_code < 500 else None
+        except (httpx.InvalidURL, httpx.UnsupportedProtocol, ValueError):
+            # A malformed link stays broken whatever the network does
+            return False
+        except httpx.HTTPError as e:
+            logging.warning(f"🔗 {url} unreachable: {type(e).__name__}")
+            return None
+
+    def _load_cache(self) -> Dict[str, dict]:
+        # A new session starts from the links known to the default session
+        cache_file = self.cache_file if os.path.isfile(self.cache_file) or not self.seed_file else self.seed_file
+        if os.path.isfile(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.error(f"Failed to read link cache: {e}")
+        return {}
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with self.lock:
+                snapshot = dict(self.cache)
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=4, ensure_ascii=False)
+        except Exception as e:
+            logging.error(f"Failed to write link cache: {e}")
@@ -4,173 +4,60 @@ import os, json, logging, subprocess, asyncio, uvicorn
 from datetime import datetime, timedelta
 from secretary import *
 from expert import *
+from planner import *
+from scheduler import *
 
 logging.basicConfig(level=logging.INFO)
 base_path = os.path.dirname(os.path.abspath(__file__))
 
 class Bass (Expert):
-    def __init__(self):
-        self.session_id = "default"
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
         self.source_path = os.path.join(base_path, "Bass/src/")
         self.answer_path = os.path.join(base_path, "Bass/answers/")
         self.input_path = os.path.join(base_path, "Bass/inputs/")
         self.output_path = os.path.join(base_path, "Bass/outputs/")
         super().__init__()
-        
-    def _expert_filter(self, instrument_data: InstrumentData) -> bool:
-        if instrument_data.category == "Baffles Basse":
-            if float(instrument_data.price) < 250 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Contrebasse":
-            if float(instrument_data.price) < 500 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Tête Basse":
-            if float(instrument_data.price) < 250 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Combo Basse":
-            if float(instrument_data.price) < 250 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Pédales Basse":
-            if float(instrument_data.price) < 25 or float(instrument_data.price) > 600:
-                return False
-        if instrument_data.category == "Basses Electriques":
-            if float(instrument_data.price) < 400 or float(instrument_data.price) > 10000:
-                return False
-        return True
 
 class DJ (Expert):
-    def __init__(self):
-        self.session_id = "default"
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
         self.source_path = os.path.join(base_path, "DJ/src/")
         self.answer_path = os.path.join(base_path, "DJ/answers/")
         self.input_path = os.path.join(base_path, "DJ/inputs/")
         self.output_path = os.path.join(base_path, "DJ/outputs/")
         super().__init__()
 
-    def _expert_filter(self, instrument_data: InstrumentData) -> bool:
-        if instrument_data.category == "Platine CD / CD player":
-            if float(instrument_data.price) < 600 or float(instrument_data.price) > 3000:
-                return False
-        if instrument_data.category == "Platine vinyl / Vinyl":
-            if float(instrument_data.price) < 600 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Mixette":
-            if float(instrument_data.price) < 100 or float(instrument_data.price) > 4000:
-                return False
-        if instrument_data.category == "Effets DJ / DJ FX":
-            if float(instrument_data.price) < 100 or float(instrument_data.price) > 800:
-                return False
-        return True
-        
 class Drums (Expert):
-    def __init__(self):
-        self.session_id = "default"
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
         self.source_path = os.path.join(base_path, "Drums/src/")
         self.answer_path = os.path.join(base_path, "Drums/answers/")
         self.input_path = os.path.join(base_path, "Drums/inputs/")
         self.output_path = os.path.join(base_path, "Drums/outputs/")
         super().__init__()
 
-    def _expert_filter(self, instrument_data: InstrumentData) -> bool:
-        if instrument_data.category == "Batteries Électroniques":
-            if float(instrument_data.price) < 300 or float(instrument_data.price) > 10000:
-                return False
-        if instrument_data.category == "Cymbales":
-            if float(instrument_data.price) < 59 or float(instrument_data.price) > 1900:
-                return False
-        if instrument_data.category == "Percussions Classiques":
-            if float(instrument_data.price) < 700 or float(instrument_data.price) > 25000:
-                return False
-        if instrument_data.category == "Percussions Latines":
-            if float(instrument_data.price) < 15 or float(instrument_data.price) > 1300:
-                return False
-        if instrument_data.category == "Accessoires de Batterie":
-            if float(instrument_data.price) < 40 or float(instrument_data.price) > 500:
-                return False
-        if instrument_data.category == "Batteries Acoust.":
-            if float(instrument_data.price) < 300 or float(instrument_data.price) > 10000:
-                return False
-        if instrument_data.category == "Caisses Claires":
-            if float(instrument_data.price) < 80 or float(instrument_data.price) > 3000:
-                return False
-        return True
-        
 class Guitars (Expert):
-    def __init__(self):
-        self.session_id = "default"
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
         self.source_path = os.path.join(base_path, "Guitars/src/")
         self.answer_path = os.path.join(base_path, "Guitars/answers/")
         self.input_path = os.path.join(base_path, "Guitars/inputs/")
         self.output_path = os.path.join(base_path, "Guitars/outputs/")
         super().__init__()
 
-    def _expert_filter(self, instrument_data: InstrumentData) -> bool:
-        if instrument_data.category == "Baffles Guitare":
-            if float(instrument_data.price) < 250 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Guitares Electriques":
-            if float(instrument_data.price) < 400 or float(instrument_data.price) > 10000:
-                return False
-        if instrument_data.category == "Accessoires Guitare":
-            if float(instrument_data.price) < 15 or float(instrument_data.price) > 300:
-                return False
-        if instrument_data.category == "Pédales Guitare":
-            if float(instrument_data.price) < 25 or float(instrument_data.price) > 600:
-                return False
-        if instrument_data.category == "Guitares Acoustiques":
-            if float(instrument_data.price) < 100 or float(instrument_data.price) > 10000:
-                return False
-        if instrument_data.category == "Tête Guitare":
-            if float(instrument_data.price) < 250 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Combo Guitare":
-            if float(instrument_data.price) < 250 or float(instrument_data.price) > 5000:
-                return False
-
-        return True
-
 class Keyboards (Expert):
-    def __init__(self):
-        self.session_id = "default"
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
         self.source_path = os.path.join(base_path, "Keyboards/src/")
         self.answer_path = os.path.join(base_path, "Keyboards/answers/")
         self.input_path = os.path.join(base_path, "Keyboards/inputs/")
         self.output_path = os.path.join(base_path, "Keyboards/outputs/")
         super().__init__()
 
-    def _expert_filter(self, instrument_data: InstrumentData) -> bool:
-        if instrument_data.category == "Piano numérique":
-            if float(instrument_data.price) < 200 or float(instrument_data.price) > 20000:
-                return False
-        if instrument_data.category == "Clavier MIDI":
-            if float(instrument_data.price) < 50 or float(instrument_data.price) > 1400:
-                return False
-        if instrument_data.category == "Piano electrique":
-            if float(instrument_data.price) < 1500 or float(instrument_data.price) > 15000:
-                return False
-        if instrument_data.category == "Pédales Clavier":
-            if float(instrument_data.price) < 90 or float(instrument_data.price) > 400:
-                return False
-        if instrument_data.category == "Amplis clavier":
-            if float(instrument_data.price) < 300 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Clavier de scene":
-            if float(instrument_data.price) < 900 or float(instrument_data.price) > 15000:
-                return False
-        if instrument_data.category == "Workstation":
-            if float(instrument_data.price) < 500 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Synthétiseur":
-            if float(instrument_data.price) < 150 or float(instrument_data.price) > 3500:
-                return False
-        if instrument_data.category == "Orgue":
-            if float(instrument_data.price) < 400 or float(instrument_data.price) > 5000:
-                return False
-        return True
-
 class Mics (Expert):
-    def __init__(self):
-        self.session_id = "default"
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
         self.source_path = os.path.join(base_path, "Mics/src/")
         self.answer_path = os.path.join(base_path, "Mics/answers/")
         self.input_path = os.path.join(base_path, "Mics/inputs/")
@@ -179,14 +66,9 @@ class Mics (Expert):
         self.output_file = os.path.join(base_path, "Mics/outputs/output_Microphones.csv")
         super().__init__()
 
-    def _expert_filter(self, instrument_data: InstrumentData) -> bool:
-        if float(instrument_data.price) < 80 or float(instrument_data.price) > 1900:
-            return False
-        return True
-
 class Other (Expert):
-    def __init__(self):
-        self.session_id = "default"
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
         self.source_path = os.path.join(base_path, "Other/src/")
         self.answer_path = os.path.join(base_path, "Other/answers/")
         self.input_path = os.path.join(base_path, "Other/inputs/")
@@ -195,53 +77,50 @@ class Other (Expert):
         self.output_file = os.path.join(base_path, "Other/outputs/output_Accessoires.csv")
         super().__init__()
 
-    def _expert_filter(self, instrument_data: InstrumentData) -> bool:
-        if float(instrument_data.price) < 15 or float(instrument_data.price) > 300:
-            return False
-        return True
-
 class Sono (Expert):
-    def __init__(self):
-        self.session_id = "default"
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
         self.source_path = os.path.join(base_path, "Sono/src/")
         self.answer_path = os.path.join(base_path, "Sono/answers/")
         self.input_path = os.path.join(base_path, "Sono/inputs/")
         self.output_path = os.path.join(base_path, "Sono/outputs/")
         super().__init__()
 
-    def _expert_filter(self, instrument_data: InstrumentData) -> bool:
-        if instrument_data.category == "Tables de mixage":
-            if float(instrument_data.price) < 100 or float(instrument_data.price) > 10000:
-                return False
-        if instrument_data.category == "Set de Sonorisation":
-            if float(instrument_data.price) < 200 or float(instrument_data.price) > 5000:
-                return False
-        if instrument_data.category == "Enceintes de Sonorisation":
-            if float(instrument_data.price) < 200 or float(instrument_data.price) > 5000:
-                return False
-        return True
-
 if __name__ == "__main__":
 
     debug_autologue = False
+    # Run in an isolated namespace, promoted into the catalogue at the end ("default" = in place)
+    session_autologue = "default"
+    dry_run_autologue = False
+    # Research budget for this run (None = unlimited)
+    budget_calls = None
+    budget_tokens = None
+    budget_minutes = None
+    # Duplicate calls slower than the p95 of their field, at most hedge_extra more calls (None = off)
+    hedge_extra = None
+
+    # Estimate the run without calling any API
+    if dry_run_autologue == True:
+        Planner().plan(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"])
+        raise SystemExit(0)
 
     # Instanciate agents
     secretary = Secretary()
-    bass = Bass()
-    dj = DJ()
-    drums = Drums()
-    guitars = Guitars()
-    keyboards = Keyboards()
-    mics = Mics()
-    other = Other()
-    sono = Sono()
+    bass = Bass(session_autologue)
+    dj = DJ(session_autologue)
+    drums = Drums(session_autologue)
+    guitars = Guitars(session_autologue)
+    keyboards = Keyboards(session_autologue)
+    mics = Mics(session_autologue)
+    other = Other(session_autologue)
+    sono = Sono(session_autologue)
     
     # Reset autologue
     if debug_autologue == True:
         # Reset outputs
-        secretary.clean_answers(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"])
-        secretary.clean_outputs(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"])
-        secretary.clean_errors(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"])
+        secretary.clean_answers(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"], session_autologue)
+        secretary.clean_outputs(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"], session_autologue)
+        secretary.clean_errors(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"], session_autologue)
         # Reset context
         bass._reset_context()
         dj._reset_context()
@@ -267,28 +146,21 @@ if __name__ == "__main__":
                 last = datetime.strptime(info["last_updated"], "%d-%m-%y-%Hh%M:%S")
             if datetime.now() - last > timedelta(days=60):
                 logging.info("Updating Autologue...")
-                secretary.clean_answers(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"])
-                secretary.clean_prices(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"])
+                secretary.clean_answers(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"], session_autologue)
+                secretary.clean_prices(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"], session_autologue)
     except Exception as e:
         logging.error(f"Failed to read info file: {e}")
     
-    # Process catalogue
-    logging.info("Processing 🐟 ... \n")
-    bass.process_multiple_files()
-    logging.info("Processing 🎛 ... \n")
-    dj.process_multiple_files()
-    logging.info("Processing 🥁 ... \n")
-    drums.process_multiple_files()
-    logging.info("Processing 🎸 ... \n")
-    guitars.process_multiple_files()
-    logging.info("Processing 🎹 ... \n")
-    keyboards.process_multiple_files()
-    logging.info("Processing 🎤 ... \n")
-    mics.process_file()
-    logging.info("Processing 🛠 ... \n")
-    other.process_file()
-    logging.info("Processing 🔊 ... \n")
-    sono.process_multiple_files()
+    # Process catalogue, most important instruments first
+    logging.info("Processing 🐟 🎛 🥁 🎸 🎹 🎤 🛠 🔊 ... \n")
+    budget = ResearchBudget(max_calls=budget_calls, max_tokens=budget_tokens, deadline_s=budget_minutes * 60 if budget_minutes else None)
+    hedging = HedgePolicy(extra_ratio=hedge_extra) if hedge_extra else None
+    scheduler = Scheduler([bass, dj, drums, guitars, keyboards, mics, other, sono], budget, hedging=hedging)
+    scheduler.run()
     
+    # Promote session results into the catalogue
+    for expert in [bass, dj, drums, guitars, keyboards, mics, other, sono]:
+        expert.promote_session()
+
     # Export outputs
     secretary.concatenate_outputs(["Bass", "DJ", "Drums", "Guitars", "Keyboards", "Mics", "Other", "Sono"])
@@ -0,0 +1,108 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os, json, logging
+import pandas as pd
+import numpy as np
+
+from expert import research_fields, missing_values, field_prompts, load_query_profiles
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+
+class Planner():
+
+    def __init__(self):
+        self.concurrency = int(os.getenv("AUTOLOGUE_CONCURRENCY", "1"))
+        # sonar-pro list prices in USD, override through the environment when they change
+        self.input_token_price = float(os.getenv("PLAN_INPUT_TOKEN_PRICE", "3")) / 1_000_000
+        self.output_token_price = float(os.getenv("PLAN_OUTPUT_TOKEN_PRICE", "15")) / 1_000_000
+        self.request_price = float(os.getenv("PLAN_REQUEST_PRICE", "6")) / 1000
+        self.seconds_per_call = float(os.getenv("PLAN_SECONDS_PER_CALL", "8"))
+        self.chars_per_token = 4
+        # Completions are capped per field, estimate the worst case
+        profiles = load_query_profiles(os.path.join(base_path, "query-profiles.json"))
+        self.field_max_tokens = np.array([profiles[field]["max_tokens"] for field in research_fields])
+        self.field_tokens = np.array([self._count_tokens(self._fetch_prompt(os.path.join(base_path, field_prompts[field]))) for field in research_fields])
+
+    def plan(self, supercategories: list[str]) -> dict:
+        frame = self._load_inputs(supercategories)
+        if frame.empty:
+            logging.info("🧮 Nothing to plan, no pending instruments. \n")
+            return {}
+        pending = frame[~frame["processed"]].reset_index(drop=True)
+        # Same emptiness rules as Expert._is_missing, one column per researched field
+        values = pending[research_fields].apply(lambda column: column.astype(str).str.strip())
+        missing = (pending[research_fields].isna() | values.isin(missing_values)).to_numpy()
+        # Every query carries the agent prompt, the field prompt and the instrument name
+        base_tokens = pending["agent_tokens"].to_numpy() + pending["name"].astype(str).map(self._count_tokens).to_numpy()
+        input_tokens = missing * (base_tokens[:, None] + self.field_tokens[None, :])
+        calls_per_row = missing.sum(axis=1)
+        calls = int(calls_per_row.sum())
+        tokens_in = int(input_tokens.sum())
+        tokens_out = int((missing * self.field_max_tokens[None, :]).sum())
+        plan = {
+            "instruments": int((calls_per_row > 0).sum()),
+            "complete": int(len(pending) - (calls_per_row > 0).sum()),
+            "skipped": int(frame["processed"].sum()),
+            "calls": calls,
+            "fields": dict(zip(research_fields, missing.sum(axis=0).astype(int).tolist())),
+            "categories": pending.assign(calls=calls_per_row).groupby("category_name")["calls"].sum().astype(int).to_dict(),
+            "supercategories": pending.assign(calls=calls_per_row).groupby("supercategory")["calls"].sum().astype(int).to_dict(),
+            "tokens": {"input": tokens_in, "output": tokens_out},
+            "wall_clock_s": round(calls * self.seconds_per_call / max(1, self.concurrency), 1),
+            "cost_usd": round(tokens_in * self.input_token_price + tokens_out * self.output_token_price + calls * self.request_price, 2),
+        }
+        self._log_plan(plan)
+        return plan
+
+    def _load_inputs(self, supercategories: list[str]) -> pd.DataFrame:
+        frames = []
+        for supercategory in supercategories:
+            input_path = os.path.join(base_path, f"{supercategory}/inputs/")
+            source_path = os.path.join(base_path, f"{supercategory}/src/")
+            if not os.path.isdir(input_path):
+                continue
+            processed = self._load_processed(os.path.join(source_path, "context.json"))
+            agent_tokens = self._count_tokens(self._fetch_prompt(os.path.join(source_path, "prompt-agent.md")))
+            for file in sorted(os.listdir(input_path)):
+                try:
+                    df = pd.read_table(os.path.join(input_path, file))
+                except Exception as e:
+                    logging.error(f"❌ Error reading {file}: {e}")
+                    continue
+                for field in research_fields:
+                    if field not in df.columns:
+                        df[field] = np.nan
+                df["supercategory"] = supercategory
+                df["agent_tokens"] = agent_tokens
+                df["processed"] = df["name"].astype(str).str.strip().isin(processed)
+                frames.append(df)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def _load_processed(self, context_file: str) -> set:
+        try:
+            with open(context_file, "r", encoding="utf-8") as f:
+                return set(json.load(f).get("instruments_processed", []))
+        except Exception:
+            return set()
+
+    def _fetch_prompt(self, prompt_file: str) -> str:
+        try:
+            with open(prompt_file, "r", encoding="utf-8") as f:
+                return f.read()
+        except Exception:
+            return ""
+
+    def _count_tokens(self, text: str) -> int:
+        return len(text) // self.chars_per_token + 1
+
+    def _log_plan(self, plan: dict):
+        logging.info(f"🧮 Query plan: {plan['calls']} calls for {plan['instruments']} instruments ({plan['complete']} complete, {plan['skipped']} already processed)")
+        for field, count in plan["fields"].items():
+            logging.info(f"   {field}: {count}")
+        for supercategory, count in plan["supercategories"].items():
+            logging.info(f"   {supercategory}: {count}")
+        logging.info(f"🧮 Estimated tokens: {plan['tokens']['input']} in / {plan['tokens']['output']} out")
+        logging.info(f"🧮 Estimated wall-clock: {plan['wall_clock_s']} s at concurrency {self.concurrency}")
+        logging.info(f"💰 Estimated cost: {plan['cost_usd']} USD \n")
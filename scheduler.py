@@ -0,0 +1,158 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import logging, threading, time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+class BudgetExhausted(Exception):
+    pass
+
+class ResearchBudget():
+
+    # Hard limits for one run, None means unlimited
+    def __init__(self, max_calls: Optional[int] = None, max_tokens: Optional[int] = None, deadline_s: Optional[float] = None):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.deadline = time.monotonic() + deadline_s if deadline_s else None
+        self.calls = 0
+        self.tokens = 0
+        self.lock = threading.Lock()
+
+    def exhausted(self) -> bool:
+        if self.max_calls is not None and self.calls >= self.max_calls:
+            return True
+        if self.max_tokens is not None and self.tokens >= self.max_tokens:
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return False
+
+    def reserve(self):
+        with self.lock:
+            if self.exhausted():
+                raise BudgetExhausted(f"{self.calls} calls, {self.tokens} tokens spent")
+            self.calls += 1
+
+    def charge(self, tokens: int):
+        with self.lock:
+            self.tokens += tokens
+
+class HedgePolicy():
+
+    # A duplicate call is fired once a call outlives the running percentile of its field,
+    # hedges are capped to extra_ratio of all calls
+    def __init__(self, extra_ratio: float = 0.05, percentile: float = 95, window: int = 200, min_samples: int = 20, workers: int = 32):
+        self.extra_ratio = extra_ratio
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.latencies: Dict[str, deque] = {}
+        self.calls = 0
+        self.hedges = 0
+        self.wins = 0
+        self.lock = threading.Lock()
+
+    def delay(self, key: str) -> Optional[float]:
+        with self.lock:
+            samples = list(self.latencies.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return float(np.percentile(samples, self.percentile))
+
+    def record(self, key: str, seconds: float):
+        with self.lock:
+            self.latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def run(self, key: str, attempt: Callable[[threading.Event], Any], valid: Callable[[Any], bool]):
+        """Call attempt(cancel), hedged past the percentile; the first valid answer wins and the other attempt is cancelled"""
+        with self.lock:
+            self.calls += 1
+        delay = self.delay(key)
+        if delay is None:
+            return self._timed(key, attempt, threading.Event())
+        cancels = [threading.Event()]
+        futures = [self.pool.submit(self._timed, key, attempt, cancels[0])]
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._allow():
+            logging.info(f"🐢 {key} call slower than p{self.percentile:g} ({delay:.1f}s), hedging")
+            cancels.append(threading.Event())
+            futures.append(self.pool.submit(self._timed, key, attempt, cancels[1]))
+        winner, pending = None, set(futures)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in futures if future in done and future.exception() is None and valid(future.result())), None)
+        for future, cancel in zip(futures, cancels):
+            if future is not winner:
+                cancel.set()
+        if winner is None:
+            # Neither answer is usable, report the original call's outcome
+            return futures[0].result()
+        if winner is not futures[0]:
+            with self.lock:
+                self.wins += 1
+        return winner.result()
+
+    def _allow(self) -> bool:
+        with self.lock:
+            if self.hedges + 1 > self.extra_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _timed(self, key: str, attempt: Callable[[threading.Event], Any], cancel: threading.Event):
+        start = time.monotonic()
+        result = attempt(cancel)
+        # A cancelled attempt was cut short, its duration says nothing about the field
+        if not cancel.is_set():
+            self.record(key, time.monotonic() - start)
+        return result
+
+class Scheduler():
+
+    def __init__(self, experts: list, budget: ResearchBudget = None, batch_size: int = 25, hedging: HedgePolicy = None):
+        self.experts = experts
+        self.budget = budget or ResearchBudget()
+        self.batch_size = batch_size
+        self.hedging = hedging
+        for expert in self.experts:
+            expert.budget = self.budget
+            if hedging is not None:
+                expert.hedging = hedging
+
+    def run(self):
+        queue = []
+        for expert in self.experts:
+            for input_file, output_file in expert._input_files():
+                for instrument_data in expert._load_instruments(input_file):
+                    if instrument_data.name not in expert.context["instruments_processed"]:
+                        queue.append((expert, output_file, instrument_data))
+        queue = [queue[i] for i in self._prioritize([item[2] for item in queue])]
+        logging.info(f"📋 {len(queue)} instruments scheduled for research \n")
+        for start in range(0, len(queue), self.batch_size):
+            if self.budget.exhausted():
+                logging.warning(f"⏹ Research budget exhausted, {len(queue) - start} instruments left for the next run. \n")
+                return
+            # Keep priority order while grouping rows that share an expert and an output file
+            groups = {}
+            for expert, output_file, instrument_data in queue[start:start + self.batch_size]:
+                groups.setdefault((id(expert), output_file), (expert, output_file, []))[2].append(instrument_data)
+            try:
+                for expert, output_file, instruments in groups.values():
+                    if expert._process_batch(instruments, output_file) == "Error":
+                        logging.error(f"❌ Research failed for {output_file}. \n")
+            except BudgetExhausted as e:
+                logging.warning(f"⏹ Research budget exhausted ({e}), stopping. \n")
+                return
+        logging.info(f"✅ Research schedule complete. {self.budget.calls} calls, {self.budget.tokens} tokens spent. \n")
+        if self.hedging is not None:
+            logging.info(f"🐢 {self.hedging.hedges} calls hedged, {self.hedging.wins} won by the duplicate. \n")
+
+    def _prioritize(self, instruments: List) -> np.ndarray:
+        # Published first, then pushed forward, then highest daily rental price, then file order
+        published = np.array([instrument_data.is_published for instrument_data in instruments], dtype=bool)
+        push_forward = np.array([instrument_data.push_forward for instrument_data in instruments], dtype=bool)
+        value = np.array([instrument_data.base_price_per_day for instrument_data in instruments], dtype=float)
+        return np.lexsort((np.arange(len(instruments)), -np.nan_to_num(value), ~push_forward, ~published))
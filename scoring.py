@@ -0,0 +1,138 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os, re, json, logging, hashlib, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+grading_prompts = {
+    "description": "Donne une note sur 33 à cette description de produit: {content}",
+    "technical_specs": "Donne une note sur 33 à cette spécification technique de produit: {content}",
+    "technical_doc": "Donne une note sur 33 à cette documentation de produit: {content}",
+}
+
+class ScoringService():
+
+    def __init__(self, client, cache_file: str, model: str = "phi", workers: int = 4, keep_alive: str = "30m", retries: int = 3, seed_file: Optional[str] = None):
+        self.client = client
+        self.cache_file = cache_file
+        self.seed_file = seed_file
+        self.model = model
+        self.keep_alive = keep_alive
+        self.retries = retries
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.inflight: Dict[str, Future] = {}
+        self.available = client is not None
+        self.cache = self._load_cache()
+
+    def submit(self, kind: str, content: str) -> Future:
+        """Queue a grading job, answered from the cache when the content was already graded"""
+        key = self._key(kind, content)
+        with self.lock:
+            if key in self.cache:
+                future = Future()
+                future.set_result(self.cache[key])
+                return future
+            if key not in self.inflight:
+                self.inflight[key] = self.pool.submit(self._grade, key, kind, content)
+            return self.inflight[key]
+
+    def submit_document(self, url: str, fetch: Callable[[str], Optional[str]]) -> Future:
+        """Fetch a document inside the pool, then grade its content"""
+        return self.pool.submit(lambda: self._grade_document(url, fetch))
+
+    def score_many(self, jobs: List[Dict[str, Future]]) -> List[float]:
+        """Sum the three notes of every instrument, a note that could not be given counts as 0"""
+        scores = []
+        for notes in jobs:
+            total = 0.0
+            for kind, future in notes.items():
+                try:
+                    note = future.result()
+                except Exception as e:
+                    logging.error(f"Error grading {kind}: {e}")
+                    note = None
+                # Higher is better: an unreachable grader or document must not earn the best note
+                total += 0.0 if note is None else note
+            scores.append(round(min(max(total, 0.0), 100.0), 2))
+        self.save()
+        return scores
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with self.lock:
+                snapshot = dict(self.cache)
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=4, ensure_ascii=False)
+        except Exception as e:
+            logging.error(f"Failed to write score cache: {e}")
+
+    def _grade_document(self, url: str, fetch: Callable[[str], Optional[str]]) -> Optional[float]:
+        content = fetch(url)
+        if not content:
+            return None
+        # Graded inline, waiting on another pool job could starve the pool
+        key = self._key("technical_doc", content)
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]
+        return self._grade(key, "technical_doc", content)
+
+    def _key(self, kind: str, content: str) -> str:
+        return hashlib.sha256(f"{self.model}\n{kind}\n{content}".encode("utf-8")).hexdigest()
+
+    def _grade(self, key: str, kind: str, content: str) -> Optional[float]:
+        try:
+            response = self._chat(grading_prompts[kind].format(content=content))
+            note = self._parse_note(response)
+            if note is not None:
+                with self.lock:
+                    self.cache[key] = note
+            logging.info(f"{kind} score: {note}")
+            return note
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def _chat(self, prompt: str) -> Optional[str]:
+        if not self.available:
+            return None
+        for attempt in range(self.retries):
+            try:
+                chat = self.client.chat(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    keep_alive=self.keep_alive,
+                    options={"num_predict": 64}
+                )
+                return chat['message']['content']
+            except Exception as e:
+                if attempt < self.retries - 1:
+                    logging.warning(f"⚠️ Grading attempt {attempt + 1} failed: {e}")
+                    time.sleep(2 ** attempt)
+                else:
+                    logging.error(f"❌ Grading failed after {self.retries} attempts: {e}")
+                    # Stop queuing work on an unreachable server for the rest of the run
+                    if isinstance(e, (ConnectionError, OSError)) or "connect" in str(e).lower():
+                        self.available = False
+        return None
+
+    def _parse_note(self, response: Optional[str]) -> Optional[float]:
+        if not isinstance(response, str):
+            return None
+        matches = re.findall(r'(\d+(?:[.,]\d+)?)\s*/\s*33', response) or re.findall(r'\d+(?:[.,]\d+)?', response)
+        if not matches:
+            return None
+        return min(max(float(matches[-1].replace(',', '.')), 0.0), 33.0)
+
+    def _load_cache(self) -> Dict[str, float]:
+        # A new session starts from the notes of the default session, they are keyed by content
+        cache_file = self.cache_file if os.path.isfile(self.cache_file) or not self.seed_file else self.seed_file
+        if os.path.isfile(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.error(f"Failed to read score cache: {e}")
+        return {}
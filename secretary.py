@@ -41,9 +41,9 @@ class Secretary():
                 df["supercategory"] = df["category_name"].apply(self._assign_supercategory)
                 df.drop([
                     "instrument_brand_id", "instrument_category_id", "main_picture_id",
-                    "links", "is_published", "base_price_per_day", "scrap_source",
+                    "links", "scrap_source",
                     "created_at", "updated_at", "slug", "seo_title",
-                    "seo_description", "seo_keywords", "push_forward", "category_id"
+                    "seo_description", "seo_keywords", "category_id"
                 ], axis=1, inplace=True, errors="ignore")
                 for category, group_df in df.groupby("category_name"):
                     safe_category = self._sanitize_filename(category)
@@ -90,41 +90,50 @@ class Secretary():
                 shutil.copy(file_path, dest_file)
         logging.info(f"✅ Copied files for processing. \n")
 
-    def clean_errors(self, supercategories: list[str]):
+    def _session_path(self, supercategory: str, session_id: str = "default") -> str:
+        if session_id == "default":
+            return os.path.join(base_path, supercategory)
+        return os.path.join(base_path, supercategory, "sessions", session_id)
+
+    def clean_errors(self, supercategories: list[str], session_id: str = "default"):
         logging.info(f"🗑 Removing all error CSV files for {len(supercategories)} supercategories \n")
         for supercategory in supercategories:
-            file_exists = os.path.isfile(os.path.join(base_path, f"{supercategory}/errors.csv"))
-            if file_exists:
-                os.remove(os.path.join(base_path, f"{supercategory}/errors.csv"))
+            error_file = os.path.join(self._session_path(supercategory, session_id), "errors.csv")
+            if os.path.isfile(error_file):
+                os.remove(error_file)
 
-    def clean_outputs(self, supercategories: list[str]):
+    def clean_outputs(self, supercategories: list[str], session_id: str = "default"):
         logging.info(f"🗑 Removing all output CSV files for {len(supercategories)} supercategories")
         for supercategory in supercategories:
-            for file in os.listdir(os.path.join(base_path, f"{supercategory}/outputs/")):
+            output_path = os.path.join(self._session_path(supercategory, session_id), "outputs")
+            if not os.path.isdir(output_path):
+                continue
+            for file in os.listdir(output_path):
                 try:
-                    os.remove(os.path.join(base_path, f"{supercategory}/outputs/{file}"))
+                    os.remove(os.path.join(output_path, file))
                 except Exception as e:
                     logging.error(f"❌ Error reading {file}: {e}")
                     return 1
 
-    def clean_answers(self, supercategories: list[str]):
+    def clean_answers(self, supercategories: list[str], session_id: str = "default"):
         logging.info(f"🗑 Removing all answer files for {len(supercategories)} supercategories \n")
         for supercategory in supercategories:
-            for file in os.listdir(os.path.join(base_path, f"{supercategory}/answers/")):
+            answer_path = os.path.join(self._session_path(supercategory, session_id), "answers")
+            if not os.path.isdir(answer_path):
+                continue
+            for file in os.listdir(answer_path):
                 try:
-                    os.remove(os.path.join(base_path, f"{supercategory}/answers/{file}"))
+                    os.remove(os.path.join(answer_path, file))
                 except Exception as e:
                     logging.error(f"❌ Error reading {file}: {e}")
                     return 1
 
-    def clean_prices(self, supercategories: list[str]):
+    def clean_prices(self, supercategories: list[str], session_id: str = "default"):
         logging.info(f"🗑 Removing all prices from output files for {len(supercategories)} supercategories \n")
         for supercategory in supercategories:
-            try:
-                output_path = os.path.join(base_path, f"{supercategory}/outputs/")
-            except Exception as e:
-                logging.error(f"❌ Error reading {error_path}: {e}")
-                return 1
+            output_path = os.path.join(self._session_path(supercategory, session_id), "outputs")
+            if not os.path.isdir(output_path):
+                continue
             for file in os.listdir(output_path):
                 try:
                     df = pd.read_csv(os.path.join(output_path, file))
@@ -0,0 +1,172 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os, re, json, logging, threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+class SemanticCache():
+
+    def __init__(self, client, index_file: str, seed_file: Optional[str] = None, model: str = "nomic-embed-text", keep_alive: str = "30m", capacity: int = 1024):
+        self.client = client
+        self.index_file = index_file
+        self.model = model
+        self.keep_alive = keep_alive
+        self.lock = threading.Lock()
+        self.available = client is not None
+        # Unit vectors, one row per known instrument, grown by doubling
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.size = 0
+        self.capacity = capacity
+        self.entries: List[dict] = []
+        self.rows: Dict[str, int] = {}
+        self.embedded: Dict[str, np.ndarray] = {}
+        self.dirty = False
+        # A new session starts from the index of the default session
+        self._load(index_file if os.path.isfile(index_file) or not seed_file else seed_file)
+
+    def nearest(self, names: List[str], categories: List[str], threshold: float) -> List[Optional[Tuple[str, dict, float]]]:
+        """Closest known instrument of the same category for every name, or None below the threshold"""
+        matches: List[Optional[Tuple[str, dict, float]]] = [None] * len(names)
+        with self.lock:
+            if not self.size or not names:
+                return matches
+        queries = self._embed(names)
+        if queries is None:
+            return matches
+        with self.lock:
+            if queries.shape[1] != self.vectors.shape[1]:
+                logging.warning(f"⚠️ Embedding size changed, semantic index of {self.size} instruments ignored")
+                return matches
+            similarity = self.vectors[:self.size] @ queries.T
+            categories_known = np.array([entry["category"] for entry in self.entries], dtype=object)
+            for i, (name, category) in enumerate(zip(names, categories)):
+                scores = np.where(categories_known == category, similarity[:, i], -1.0)
+                for row in np.flatnonzero(scores >= threshold)[np.argsort(-scores[scores >= threshold], kind="stable")]:
+                    entry = self.entries[row]
+                    if entry["name"] != name and self._same_model(entry["name"], name):
+                        matches[i] = (entry["name"], dict(entry["fields"]), float(scores[row]))
+                        break
+        return matches
+
+    def add(self, records: List[Tuple[str, str, Dict[str, str]]]):
+        """Index validated instruments as (name, category, fields), a known name is replaced"""
+        records = [record for record in records if record[2]]
+        if not records:
+            return
+        vectors = self._embed([name for name, _, _ in records])
+        if vectors is None:
+            return
+        with self.lock:
+            if self.size and vectors.shape[1] != self.vectors.shape[1]:
+                logging.warning(f"⚠️ Embedding size changed, rebuilding the semantic index")
+                self.size, self.entries, self.rows = 0, [], {}
+            for (name, category, fields), vector in zip(records, vectors):
+                row = self.rows.get(name)
+                if row is None:
+                    row = self._append_row(len(vector))
+                    self.rows[name] = row
+                    self.entries.append({})
+                self.vectors[row] = vector
+                self.entries[row] = {"name": name, "category": category, "fields": dict(fields)}
+            self.dirty = True
+
+    def merge(self, other: "SemanticCache"):
+        """Take every instrument of another index of the same model, its entries win"""
+        with other.lock:
+            vectors = other.vectors[:other.size].copy()
+            entries = [dict(entry) for entry in other.entries]
+        if not entries or other.model != self.model:
+            return
+        with self.lock:
+            if self.size and vectors.shape[1] != self.vectors.shape[1]:
+                logging.warning(f"⚠️ Embedding size changed, replacing the semantic index")
+                self.size, self.entries, self.rows = 0, [], {}
+            for entry, vector in zip(entries, vectors):
+                row = self.rows.get(entry["name"])
+                if row is None:
+                    row = self._append_row(len(vector))
+                    self.rows[entry["name"]] = row
+                    self.entries.append({})
+                self.vectors[row] = vector
+                self.entries[row] = entry
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            vectors = self.vectors[:self.size].copy()
+            entries = json.dumps({"model": self.model, "entries": self.entries}, ensure_ascii=False)
+            self.dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            # Write then rename so an interrupted run keeps the previous index
+            tmp_file = f"{self.index_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, "wb") as f:
+                np.savez(f, vectors=vectors, entries=np.array(entries))
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            logging.error(f"Failed to write semantic index: {e}")
+
+    def _append_row(self, dimensions: int) -> int:
+        if self.size == self.vectors.shape[0] or self.vectors.shape[1] != dimensions:
+            grown = np.zeros((max(self.capacity, 2 * self.size), dimensions), dtype=np.float32)
+            if self.vectors.shape[1] == dimensions:
+                grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        self.size += 1
+        return self.size - 1
+
+    def _embed(self, names: List[str]) -> Optional[np.ndarray]:
+        keys = [self._normalize(name) for name in names]
+        with self.lock:
+            unknown = list(dict.fromkeys(key for key in keys if key not in self.embedded))
+        if unknown:
+            if not self.available:
+                return None
+            try:
+                response = self.client.embed(model=self.model, input=unknown, keep_alive=self.keep_alive)
+                vectors = np.asarray(response["embeddings"], dtype=np.float32)
+            except Exception as e:
+                logging.warning(f"⚠️ Embedding with {self.model} failed, semantic cache disabled: {e}")
+                self.available = False
+                return None
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            with self.lock:
+                self.embedded.update(zip(unknown, vectors))
+        with self.lock:
+            return np.stack([self.embedded[key] for key in keys])
+
+    def _normalize(self, name: str) -> str:
+        return re.sub(r"\s+", " ", str(name)).strip().casefold()
+
+    def _numbers(self, name: str) -> List[str]:
+        return re.findall(r"\d+", str(name))
+
+    def _same_model(self, known: str, name: str) -> bool:
+        # Model numbers must agree, "121" and "210" embed almost identically
+        numbers = self._numbers(name)
+        if numbers:
+            return self._numbers(known) == numbers
+        # Without a number nothing tells two models apart, only the same name written differently
+        return not self._numbers(known) and re.sub(r"[\W_]+", "", known).casefold() == re.sub(r"[\W_]+", "", name).casefold()
+
+    def _load(self, index_file: str):
+        if not os.path.isfile(index_file):
+            return
+        try:
+            with np.load(index_file, allow_pickle=False) as data:
+                vectors = data["vectors"].astype(np.float32)
+                stored = json.loads(str(data["entries"]))
+        except Exception as e:
+            logging.error(f"Failed to read semantic index: {e}")
+            return
+        # Vectors of another embedding model are not comparable
+        if stored.get("model") != self.model or len(stored.get("entries", [])) != len(vectors):
+            logging.warning(f"⚠️ Semantic index built with {stored.get('model')}, starting a new one")
+            return
+        self.entries = stored["entries"]
+        self.size = len(vectors)
+        self.vectors = np.zeros((max(self.capacity, self.size), vectors.shape[1] if vectors.ndim == 2 else 0), dtype=np.float32)
+        self.vectors[:self.size] = vectors
+        self.rows = {entry["name"]: row for row, entry in enumerate(self.entries)}
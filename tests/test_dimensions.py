@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import expert
+from expert import Expert, InstrumentData, length_units, weight_units
+
+
+@pytest.fixture
+def parser():
+    # The parsers only use the instance for their helpers, no clients are needed
+    return Expert.__new__(Expert)
+
+
+def derive(parser, specs):
+    instrument_data = InstrumentData(
+        id='1', name='Test', type='t', model='m', description='x', price='1',
+        dimensions=['nan', 'nan', 'nan', 'nan'], technical_specs=specs, technical_doc='u',
+        category='c', confidence_score=0, llm2llm_score=0, retries_number=0,
+    )
+    parser._derive_dimensions(instrument_data)
+    return dict(zip(expert.dimension_fields, instrument_data.dimensions))
+
+
+@pytest.mark.parametrize("text, key, expected", [
+    ('1 200 g', 'Poids', 1.2),
+    ('1\u202f200 g', 'Poids', 1.2),
+    ('3.2 kg (7 lbs)', 'Poids', 3.2),
+    ('3,2', 'Poids (kg)', 3.2),
+    ('16', 'Weight in lbs', 16 * 0.45359237),
+    ('3', 'Poids net', None),
+    ('50 Hz', 'Weight', None),
+])
+def test_parse_weight(parser, text, key, expected):
+    measure = parser._parse_measure(text, weight_units, key)
+    assert measure is None if expected is None else measure == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text, key, expected", [
+    ('1 m 20', 'Hauteur', 120),
+    ('1m05', 'Hauteur', 105),
+    ('39 cm', 'Hauteur', 39),
+    ('1 250 mm', 'Longueur', 125),
+    ('60 à 90 cm', 'Hauteur', None),
+])
+def test_parse_length(parser, text, key, expected):
+    measure = parser._parse_measure(text, length_units, key)
+    assert measure is None if expected is None else measure == pytest.approx(expected)
+
+
+def test_parse_dimensions_thousands(parser):
+    assert parser._parse_dimensions('Dimensions', '1 250 x 300 x 200 mm') == pytest.approx({'width_cm': 125, 'height_cm': 30, 'length_cm': 20})
+
+
+def test_parse_dimensions_own_units(parser):
+    assert parser._parse_dimensions('Size', '19" x 2U x 10"') == {}
+    assert parser._parse_dimensions('Dimensions (L x l x H)', '250 x 332 x 390 mm') == pytest.approx({'length_cm': 25, 'width_cm': 33.2, 'height_cm': 39})
+
+
+def test_derive_skips_accessory_keys(parser):
+    derived = derive(parser, {'Cable length': '3 m', 'Max load weight': '100 kg', 'Bit depth': '24-bit', 'Hauteur': '1 m 20', 'Poids (kg)': '3,2'})
+    assert derived == {'length_cm': 'nan', 'width_cm': 'nan', 'height_cm': '120.0', 'weight_kg': '3.2'}